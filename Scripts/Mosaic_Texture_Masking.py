@@ -7,99 +7,253 @@
 # Licence:     Apache Version 2.0
 # -----------------------------------------------------------------------------------------------------
 
-from arcpy import Describe
-from arcpy.management import ExportMosaicDatasetPaths, Delete
 from os import path, makedirs
-from arcpy import da
 
 
-def texture_images(i_list, extent, in_texture, in_polygon, out_folder, method, blur_distance):
+def texture_images(i_list, extent, in_texture, in_polygon, out_folder, method, blur_distance, memory_budget=None,
+                   max_workers=None, queue_dir=None, backend=None, use_daemon=False, dedup=True, generalize=True,
+                   metrics_file=None, progressor=False):
+    # Creating out_folder/CANCEL (or the geoprocessing Cancel button) stops the run after the in-flight tiles
+    from shutil import rmtree
+    from run_monitor import ThroughputMonitor, CancelToken, CANCEL_FILE, clean_intermediates
+    from shared_texture import detach
+    cancel = CancelToken(path.join(out_folder, CANCEL_FILE))
+    jobs, estimates, work_dir = prepare_texture_jobs(i_list, in_texture, in_polygon, out_folder, method,
+                                                     blur_distance, backend, dedup, generalize)
+    try:
+        with ThroughputMonitor(len(jobs), metrics_file, progressor) as monitor:
+            run_texture_jobs(jobs, estimates, memory_budget, max_workers, queue_dir, use_daemon, monitor.tile_done,
+                             cancel=cancel, backend=backend)
+    finally:
+        detach()  # Sequential runs map the shared texture in this process
+        rmtree(work_dir, ignore_errors=True)
+        if cancel.is_set():
+            clean_intermediates(out_folder)
+
+
+def prepare_texture_jobs(i_list, in_texture, in_polygon, out_folder, method, blur_distance, backend=None, dedup=True,
+                         generalize=True):
+    # Returns the texture_image argument tuples of a mosaic, their memory estimates and the work folder
+    # (shared texture, tile cache) that must be removed once all of the mosaic's tiles are done
+    from raster_backend import get_backend
+    from memory_scheduler import estimate_catalog
+    backend = get_backend(backend)
+    backend_name = backend.name  # backend is passed on by name so jobs can be pickled / published to the queue
+    if generalize:
+        # Drop vertices finer than the ortho resolution (cached per feature class and cell size)
+        from generalize_polygons import cell_size_of
+        in_polygon = backend.generalize_polygons(in_polygon, cell_size_of(i_list), i_list[0][0])
+    # Read the polygons once and hand each tile only its own pre-clipped geometry
+    partitions = backend.partition_polygons(in_polygon, i_list)
     max_height = max(i_list, key=lambda x: x[5])[5]
     max_width = max(i_list, key=lambda x: x[6])[6]
+    # Beside (not inside) out_folder so it is never added to a mosaic dataset
+    from tempfile import mkdtemp
+    from shared_texture import create_shared_texture
+    work_dir = mkdtemp(prefix="texture_work_", dir=path.dirname(path.abspath(out_folder)))
+    cache_dir = path.join(work_dir, "tile_cache") if dedup else None
+    # Decode and resize the texture once, every tile (and worker process) crops from the shared copy
+    shared_texture = create_shared_texture(in_texture, max_width, max_height, work_dir)
+    jobs = []
     for i in i_list:
-        # TODO: Migrate to support multiple cores for faster processing time
         out_raster = path.join(out_folder, path.splitext(path.basename(i[0]))[0] + "_design.jpg")
-        texture_image(i[0], i[5], i[6], i[7], max_height, max_width, in_texture, in_polygon, out_raster, method,
-                      blur_distance)
+        jobs.append((i[0], i[5], i[6], i[7], max_height, max_width, in_texture, in_polygon, out_raster, method,
+                     blur_distance, backend_name, partitions[i[0]], cache_dir, shared_texture))
+    return jobs, estimate_catalog(i_list, blur_distance, shared_texture=True), work_dir
+
+
+def run_texture_jobs(jobs, estimates, memory_budget, max_workers, queue_dir, use_daemon, on_done=None,
+                     priorities=None, cancel=None, backend=None):
+    # on_done(index, timings) is called in this process as each job succeeds, in completion order.
+    # Jobs are otherwise started in list order, priorities only reorders the memory scheduler.
+    # A failed tile does not stop the others in any mode, RuntimeError listing the failures is raised at the end.
+    # Returns the texture_image timings of every job and records them as run_planner calibration.
+    # Once cancel (run_monitor.CancelToken) is set no new tiles start, in-flight tiles finish and
+    # CancelledError is raised if any tile was left out.
+    # backend is the one the jobs were prepared with, worker processes are set up for it (arcpy by default).
+    from run_planner import record_calibration
+    from run_monitor import CancelledError
+    results = [None] * len(jobs)
+    failures = []
+
+    def done(index, result):
+        results[index] = result
+        if on_done:
+            on_done(index, result)
+
+    def failed(index, error):
+        failures.append((index, error))
+
+    cancelled = cancel.is_set if cancel else None
+    try:
+        run_jobs(jobs, estimates, memory_budget, max_workers, queue_dir, use_daemon, done, failed, priorities,
+                 cancelled, backend)
+    finally:
+        record_calibration([result for result in results if result])
+    if failures:
+        raise RuntimeError("{0} tiles failed:\n{1}".format(
+            len(failures), "\n".join("{0}: {1}".format(jobs[index][0], error) for index, error in sorted(failures))))
+    if cancelled and cancelled() and None in results:
+        raise CancelledError("Cancelled after {0} of {1} tiles".format(len(results) - results.count(None),
+                                                                        len(results)))
+    return results
+
+
+def run_jobs(jobs, estimates, memory_budget, max_workers, queue_dir, use_daemon, done, failed, priorities,
+             cancelled=None, backend=None):
+    from traceback import format_exc
+    from raster_backend import get_backend
+    backend_name = get_backend(backend).name
+
+    if queue_dir:
+        # Distributed: publish the tiles to the shared queue, drain it with local workers (plus any
+        # "python work_queue.py <queue_dir>" workers on other hosts) and wait for every tile
+        from work_queue import publish_jobs, run_local_workers, iter_finished
+        job_ids = publish_jobs(queue_dir, "texture_image", jobs)
+        workers = run_local_workers(queue_dir, max_workers or 1, backend=backend_name)
+        indexes = {job_id: index for index, job_id in enumerate(job_ids)}
+        for job_id, job in iter_finished(queue_dir, job_ids, cancelled=cancelled,
+                                         workers_alive=lambda: any(w.is_alive() for w in workers)):
+            if job.get("error"):
+                failed(indexes[job_id], job["error"])
+            else:
+                done(indexes[job_id], job.get("result"))
+        for w in workers:
+            w.join()
+        return
+    if use_daemon:
+        # Run the tiles in the warm worker_daemon (arcpy imported, extension already checked out)
+        from worker_daemon import submit
+        for index, job in enumerate(jobs):
+            if cancelled and cancelled():
+                break
+            try:
+                result = submit("texture_image", job)
+            except Exception:
+                failed(index, format_exc())
+                continue
+            done(index, result)
+        return
+    if not memory_budget:
+        for index, job in enumerate(jobs):
+            if cancelled and cancelled():
+                break
+            try:
+                result = texture_image(*job)
+            except Exception:
+                failed(index, format_exc())
+                continue
+            done(index, result)
+        return
+    # Run tiles in parallel worker processes while their estimated peak memory fits memory_budget (MB)
+    # texture_image by its module name: as the tool script this module is __main__, which workers cannot import
+    import Mosaic_Texture_Masking
+    from memory_scheduler import MemoryScheduler, MB
+    MemoryScheduler(memory_budget * MB, max_workers).run(Mosaic_Texture_Masking.texture_image,
+                                                         list(zip(estimates, jobs)), done, priorities, cancelled,
+                                                         failed, backend_name)
+
+
+def texture_clip_extent(position, height, width, max_height, max_width):
+    # Crop box of the max_width x max_height texture used for a tile at position within the mosaic
+    if position == "bl":
+        return max_width-width, max_height-height, width, height
+    if position == "tl":
+        return max_width - width, max_height-height, width, height
+    if position == "tr":
+        return 0, max_height-height, width, max_height
+    if position == "br":
+        return 0, max_height - height, width, height
+    if position == "l":
+        return max_width - width, 0, width, height
+    if position == "t":
+        return 0, max_height-height, width, max_height
+    if position == "r":
+        return 0, 0, width, height
+    if position == "b":
+        return 0, max_height - height, width, height
+    if position == "i":
+        return 0, 0, width, height
 
 
 def texture_image(in_image, height, width, position, max_height, max_width, in_texture, in_polygon, out_raster, method,
-                  blur_distance):
-    from create_mask import create_mask
+                  blur_distance, backend=None, clipped_polygons=None, cache_dir=None, shared_texture=None):
+    # Returns per stage timings of the tile, recorded as calibration for run_planner estimates
     from fill_masked_image import mask_image
-    from arcpy.management import BuildPyramids
+    from raster_backend import get_backend
+    from run_planner import mask_category, output_bytes, FULL
     from pathlib import Path
     from PIL import Image
+    from time import perf_counter
+    backend = get_backend(backend)
+    timings = {"pixels": height * width}
 
     # Convert the Modified polygon that now covers entire extent of Interest to Raster
+    start = perf_counter()
     temp_mask_raster = path.join(path.dirname(out_raster), Path(out_raster).stem + "_mask.jpg")
-    create_mask(in_image, in_polygon, temp_mask_raster)
+    backend.create_mask(in_image, in_polygon, temp_mask_raster, clipped_polygons)
+    timings["mask"] = perf_counter() - start
+    timings["category"] = mask_category(temp_mask_raster)
 
     #################################
     # Apply Texture Map to Image
     ###############################
     # Prep Texture for process... Align
     def get_clip_ext(position):
-        if position == "bl":
-            return max_width-width, max_height-height, width, height
-        if position == "tl":
-            return max_width - width, max_height-height, width, height
-        if position == "tr":
-            return 0, max_height-height, width, max_height
-        if position is "br":
-            return 0, max_height - height, width, height
-        if position == "l":
-            return max_width - width, 0, width, height
-        if position == "t":
-            return 0, max_height-height, width, max_height
-        if position == "r":
-            return 0, 0, width, height
-        if position == "b":
-            return 0, max_height - height, width, height
-        if position == "i":
-            return 0, 0, width, height
-
-    texture = Image.open(in_texture).resize((max_width, max_height), Image.ANTIALIAS)
-    texture_cropped = texture.crop(get_clip_ext(position))
+        return texture_clip_extent(position, height, width, max_height, max_width)
+
+    # Fully masked tiles with the same texture crop are identical, reuse the first one rendered
+    cache_key = None
+    start = perf_counter()
+    if cache_dir and timings["category"] == FULL:
+        from tile_cache import TileCache, fully_masked_key
+        cache = TileCache(cache_dir)
+        cache_key = fully_masked_key(temp_mask_raster, in_texture, (max_width, max_height), get_clip_ext(position),
+                                     (width, height), method, blur_distance)
+        if cache_key and cache.fetch(cache_key, in_image, out_raster):
+            backend.delete(temp_mask_raster)  # Delete Intermediate Data
+            timings["cache_hit"] = perf_counter() - start
+            timings["bytes"] = output_bytes(out_raster)
+            return timings
+
+    if shared_texture:
+        from shared_texture import crop
+        texture_cropped = crop(shared_texture, get_clip_ext(position))  # NumPy view of the shared texture
+    else:
+        texture = Image.open(in_texture).resize((max_width, max_height), Image.LANCZOS)
+        texture_cropped = texture.crop(get_clip_ext(position))
 
     mask_image(in_image,
                temp_mask_raster,
                texture_cropped,
                out_raster,
                method,
-               blur_distance)
-    BuildPyramids(out_raster, -1, "NONE", "NEAREST", "DEFAULT", 75, "OVERWRITE")
-    Delete(temp_mask_raster)  # Delete Intermediate Data
+               blur_distance,
+               backend)
+    timings["blend"] = perf_counter() - start
+    start = perf_counter()
+    backend.build_pyramids(out_raster)
+    timings["pyramids"] = perf_counter() - start
+    if cache_key:
+        cache.store(cache_key, out_raster)
+    backend.delete(temp_mask_raster)  # Delete Intermediate Data
+    timings["bytes"] = output_bytes(out_raster)
+    return timings
 
 
-def get_image_paths(in_mosaic):
-    temp_image_table = path.join("in_memory", "temp_image_table")
-    ExportMosaicDatasetPaths(in_mosaic, temp_image_table, '', "ALL", "RASTER;ITEM_CACHE")
-    images = set([row[0] for row in da.SearchCursor(temp_image_table, "Path")])
-    Delete(temp_image_table)
-    return images
+def get_image_paths(in_mosaic, backend=None):
+    from raster_backend import get_backend
+    return get_backend(backend).list_images(in_mosaic)
 
 
-def get_images_and_stats(in_mosaic):
-    images = get_image_paths(in_mosaic)
-    s_list = []
+def get_images_and_stats(in_mosaic, backend=None):
+    from raster_backend import get_backend
+    backend = get_backend(backend)
+    images = get_image_paths(in_mosaic, backend)
     if isinstance(images, str):  # If input is single image set as list
         images = [images]
-    # Obtain Extent Coords of each image
-    for i in images:
-        if i.lower().endswith('.jpg'):
-            desc = Describe(i+"/Band_1")
-            s_list.append([i, desc.extent.XMin, desc.extent.XMax, desc.extent.YMin, desc.extent.YMax, desc.height,
-                           desc.width])
-        else:
-            if ".Overviews" not in i:
-                desc = Describe(i)
-                from arcpy import RasterToNumPyArray
-                arr = RasterToNumPyArray(i+"/Blue", nodata_to_value=0)
-                height, width = arr.shape
-                s_list.append([i, desc.extent.XMin, desc.extent.XMax, desc.extent.YMin, desc.extent.YMax, height,
-                               width])
-                del arr
+    # Obtain Extent Coords of each image: [path, XMin, XMax, YMin, YMax, height, width]
+    s_list = [list(backend.describe(i)) for i in images]
     # Determine Maximum and Minimum coord values from list
     # -- Note: The extent values from the mosaic differ from the actual tiles... esri bug on mosaics probably.
     XMin = min(s_list, key=lambda x: x[1])[1]
@@ -138,8 +292,11 @@ def get_images_and_stats(in_mosaic):
     return s_list, extent
 
 
-def main():
-    from arcpy import CheckExtension, CheckOutExtension, CheckInExtension, ExecuteError, GetMessages, AddError
+def main(in_mosaic, in_texture, in_polygon, out_folder, method, blur_distance, memory_budget, max_workers, queue_dir,
+         dry_run=False, metrics_file=None):
+    from arcpy import CheckExtension, CheckOutExtension, CheckInExtension, ExecuteError, GetMessages, AddError, \
+        AddWarning, env
+    from run_monitor import CancelledError
 
     class LicenseError(Exception):
         pass
@@ -157,6 +314,11 @@ def main():
             AddError("PILLOW Library Not Detected. Install using Python Manager in ArcGIS Pro")
             print("PILLOW Library Not Detected. Install using Python Manager in ArcGIS Pro")
             exit()
+        if dry_run:  # Report the projected run, nothing is written
+            from run_planner import plan_mosaic, report_plan
+            report_plan(plan_mosaic(in_mosaic, in_polygon, blur_distance, memory_budget, max_workers, queue_dir))
+            CheckInExtension("ImageAnalyst")
+            return
         i_list, extent = get_images_and_stats(in_mosaic)  # Obtain image statistics and info from mosaic for processing
         for i in i_list:  # Check that output folder is not the path of i
             if out_folder == path.dirname(i[0]):
@@ -164,8 +326,20 @@ def main():
                 exit()
         if not path.exists(out_folder):
             makedirs(out_folder)
-        texture_images(i_list, extent, in_texture, in_polygon, out_folder, method, blur_distance)  # Generate Texture-Masked tiles
+        if hasattr(env, "autoCancelling"):
+            env.autoCancelling = False  # Cancel is handled between tiles, in-flight tiles are finished
+        try:
+            texture_images(i_list, extent, in_texture, in_polygon, out_folder, method, blur_distance, memory_budget,
+                           max_workers, queue_dir, metrics_file=metrics_file,
+                           progressor=True)  # Generate Texture-Masked tiles
+        except RuntimeError as e:  # Failed tiles, the other tiles are written
+            AddError(str(e))
+            print(str(e))
 
+        CheckInExtension("ImageAnalyst")
+    except CancelledError as e:
+        AddWarning(str(e))
+        print(str(e))
         CheckInExtension("ImageAnalyst")
     except LicenseError:
         AddError("Image Analyst license is unavailable")
@@ -183,12 +357,29 @@ if __name__ == "__main__":
         out_folder = r'C:\Users\geof7015\Documents\ArcGIS\Projects\ArcGIS_Image_Designer\test\tile_dune'
         method = "GaussianBlur"  # "GaussianBlur", "BoxBlur", "None"
         blur_distance = 5  # Distance in Pixels
+        memory_budget = 24000  # MB available to tile workers, 0 processes tiles one at a time
+        max_workers = 0  # 0 uses all cores
+        queue_dir = ""  # Shared folder work queue for multi-process / multi-host runs, "" runs locally
+        dry_run = False  # Only report tile categories, output size and estimated time
+        metrics_file = ""  # Progress metrics rewritten during the run, .json or .prom (Prometheus text)
     else:
-        from arcpy import GetParameterAsText, GetParameter
+        from arcpy import GetParameterAsText, GetParameter, GetArgumentCount
         in_mosaic = GetParameterAsText(0)
         in_texture = GetParameterAsText(1)
         in_polygon = GetParameterAsText(2)
         out_folder = GetParameterAsText(3)
         method = GetParameterAsText(4)  # "GaussianBlur", "BoxBlur", "None"
         blur_distance = GetParameter(5)  # Distance in Pixels
-    main()
+        # Parameters added after the published toolbox are only read when the tool defines them
+        argument_count = GetArgumentCount()
+        # MB available to tile workers, 0 processes tiles one at a time
+        memory_budget = GetParameter(6) if argument_count > 6 else 0
+        max_workers = GetParameter(7) if argument_count > 7 else 0  # 0 uses all cores
+        # Shared folder work queue for multi-process / multi-host runs
+        queue_dir = GetParameterAsText(8) if argument_count > 8 else ""
+        # Only report tile categories, output size and estimated time
+        dry_run = GetParameter(9) if argument_count > 9 else False
+        # Progress metrics rewritten during the run, .json or .prom
+        metrics_file = GetParameterAsText(10) if argument_count > 10 else ""
+    main(in_mosaic, in_texture, in_polygon, out_folder, method, blur_distance, memory_budget, max_workers, queue_dir,
+         dry_run, metrics_file)
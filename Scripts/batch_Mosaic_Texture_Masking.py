@@ -9,14 +9,39 @@
 # -----------------------------------------------------------------------------------------------------
 
 from os import path, makedirs
-from Mosaic_Texture_Masking import texture_images, get_images_and_stats
+from Mosaic_Texture_Masking import prepare_texture_jobs, run_texture_jobs, get_images_and_stats
 
 
-def main():
-    from arcpy import CheckExtension, CheckOutExtension, CheckInExtension, ExecuteError, GetMessages, AddError,\
-        ListDatasets, env, SetProgressor, SetProgressorLabel, SetProgressorPosition, ResetProgressor, Exists
-    from arcpy.management import CreateFileGDB, CreateMosaicDataset, AddRastersToMosaicDataset
+def register_tile_mosaic(fileGDB, mosaic_name, in_mosaic, out_tile_folder, num_bands, pixel_depth, product_definition,
+                         product_band_definitions):
     from arcpy import Describe
+    from arcpy.management import CreateMosaicDataset, AddRastersToMosaicDataset
+    mosaic_dataset = path.join(fileGDB, mosaic_name)
+    sr = Describe(in_mosaic).spatialReference
+    CreateMosaicDataset(fileGDB, mosaic_name, sr, num_bands, pixel_depth, product_definition, product_band_definitions)
+    AddRastersToMosaicDataset(mosaic_dataset, "Raster Dataset", out_tile_folder, "UPDATE_CELL_SIZES",
+                              "UPDATE_BOUNDARY",
+                              "NO_OVERVIEWS", None, 0, 1500, None, '', "SUBFOLDERS", "ALLOW_DUPLICATES",
+                              "NO_PYRAMIDS", "NO_STATISTICS", "NO_THUMBNAILS", '', "NO_FORCE_SPATIAL_REFERENCE",
+                              "NO_STATISTICS", None, "NO_PIXEL_CACHE")
+    return mosaic_dataset
+
+
+def main(in_mosaic_gdb, in_texture, in_polygon, out_folder, method, blur_distance, pixel_depth, num_bands,
+         product_definition, product_band_definitions, memory_budget, max_workers, queue_dir, dry_run=False,
+         metrics_file=None):
+    from arcpy import CheckExtension, CheckOutExtension, CheckInExtension, ExecuteError, GetMessages, AddError,\
+        AddMessage, AddWarning, ListDatasets, env, SetProgressor, SetProgressorLabel, SetProgressorPosition, \
+        ResetProgressor, Exists
+    from arcpy.management import CreateFileGDB
+    from concurrent.futures import ProcessPoolExecutor
+    from memory_scheduler import set_worker_executable
+    # register_tile_mosaic by its module name: as the tool script this module is __main__, which the registration
+    # process cannot import
+    import batch_Mosaic_Texture_Masking
+    from run_monitor import ThroughputMonitor, CancelToken, CancelledError, CANCEL_FILE, clean_intermediates
+    from shared_texture import detach
+    from shutil import rmtree
     from os.path import join, exists
     from os import mkdir, makedirs
 
@@ -40,41 +65,99 @@ def main():
         env.workspace = in_mosaic_gdb
         mosaics = ListDatasets("*", "Mosaic")
         file_count = len(mosaics)
-        count = 0
+        if dry_run:  # Report the projected run of every mosaic, nothing is written
+            from run_planner import plan_mosaic, report_plan
+            for mosaic in mosaics:
+                report_plan(plan_mosaic(join(in_mosaic_gdb, mosaic), in_polygon, blur_distance, memory_budget,
+                                        max_workers, queue_dir))
+            CheckInExtension("ImageAnalyst")
+            return
         SetProgressor("step", "Begin Processing Files...", 0, file_count, 1)
         if not exists(out_folder):
             makedirs(out_folder)
         fileGDB = join(out_folder, "ortho_mosaics.gdb")
         if not Exists(fileGDB):
             CreateFileGDB(out_folder, "ortho_mosaics.gdb")
-        for mosaic in mosaics:
-            print("processing mosaic {0} of {1}".format(count+1, file_count))
+        # Geoprocessing Cancel or out_folder/CANCEL stops the run after the in-flight tiles,
+        # mosaics whose tiles are all written are still registered
+        if hasattr(env, "autoCancelling"):
+            env.autoCancelling = False
+        cancel = CancelToken(join(out_folder, CANCEL_FILE))
+
+        # Catalog every mosaic first, then feed the tiles of all mosaics to one queue
+        batches = []
+        jobs = []
+        estimates = []
+        owners = []
+        for count, mosaic in enumerate(mosaics):
+            print("preparing mosaic {0} of {1}".format(count+1, file_count))
+            SetProgressorLabel("Preparing Mosaic {0}...".format(mosaic))
             in_mosaic = join(in_mosaic_gdb, mosaic)
             i_list, extent = get_images_and_stats(in_mosaic)  # Obtain image statistics and info from mosaic for processing
             for i in i_list:  # Check that output folder is not the path of i
                 if out_folder == path.dirname(i[0]):
                     AddError("outFolder cannot be the same folder/directory as images referenced in the mosaic dataset")
                     exit()
-            if not path.exists(out_folder):
-                makedirs(out_folder)
             out_tile_folder = join(out_folder, "tiles{}".format(count))
             mkdir(out_tile_folder)
-            SetProgressorLabel("Texturing Mosaic {0}...".format(count))
-            texture_images(i_list, extent, in_texture, in_polygon, out_tile_folder, method, blur_distance)  # Generate Texture-Masked tiles
-
-            mosaic_name = "tiles{}_".format(count)
-            mosaic_dataset = join(fileGDB, mosaic_name)
-            SetProgressorLabel("Creating Mosaic Dataset for Tiles of {0}...".format(mosaic))
-            sr = Describe(in_mosaic).spatialReference
-            CreateMosaicDataset(fileGDB, mosaic_name, sr, num_bands, pixel_depth, product_definition, product_band_definitions)
-            SetProgressorLabel("Adding of {0} to Mosaic Dataset...".format(mosaic))
-            AddRastersToMosaicDataset(mosaic_dataset, "Raster Dataset", out_tile_folder, "UPDATE_CELL_SIZES",
-                                      "UPDATE_BOUNDARY",
-                                      "NO_OVERVIEWS", None, 0, 1500, None, '', "SUBFOLDERS", "ALLOW_DUPLICATES",
-                                      "NO_PYRAMIDS", "NO_STATISTICS", "NO_THUMBNAILS", '', "NO_FORCE_SPATIAL_REFERENCE",
-                                      "NO_STATISTICS", None, "NO_PIXEL_CACHE")
+            mosaic_jobs, mosaic_estimates, work_dir = prepare_texture_jobs(i_list, in_texture, in_polygon,
+                                                                           out_tile_folder, method, blur_distance)
+            batches.append({"mosaic": mosaic, "in_mosaic": in_mosaic, "out_tile_folder": out_tile_folder,
+                            "mosaic_name": "tiles{}_".format(count), "work_dir": work_dir,
+                            "remaining": len(mosaic_jobs)})
+            jobs.extend(mosaic_jobs)
+            estimates.extend(mosaic_estimates)
+            owners.extend([count] * len(mosaic_jobs))
             SetProgressorPosition()
-            count += 1
+
+        # Each mosaic dataset is registered in its own process as soon as its last tile is written (failed tiles
+        # never reach tile_done, so a mosaic with a failed tile is not registered),
+        # while the remaining tiles of the other mosaics keep the workers busy
+        set_worker_executable()
+        registrations = []
+        with ProcessPoolExecutor(max_workers=1) as registrar:
+            def tile_done(index, timings):
+                monitor.tile_done(index, timings)
+                batch = batches[owners[index]]
+                batch["remaining"] -= 1
+                if batch["remaining"] == 0:
+                    detach()  # Sequential runs map the shared texture in this process
+                    rmtree(batch["work_dir"], ignore_errors=True)
+                    SetProgressorLabel("Creating Mosaic Dataset for Tiles of {0}...".format(batch["mosaic"]))
+                    registrations.append((batch, registrar.submit(
+                        batch_Mosaic_Texture_Masking.register_tile_mosaic, fileGDB, batch["mosaic_name"],
+                        batch["in_mosaic"], batch["out_tile_folder"], num_bands, pixel_depth, product_definition,
+                        product_band_definitions)))
+
+            failures = None
+            try:
+                # owners as priorities: mosaics finish (and get registered) one after another
+                with ThroughputMonitor(len(jobs), metrics_file, progressor=True) as monitor:
+                    run_texture_jobs(jobs, estimates, memory_budget, max_workers, queue_dir, False, tile_done,
+                                     owners, cancel)  # Generate Texture-Masked tiles
+            except CancelledError as e:
+                AddWarning(str(e))
+                print(str(e))
+            except RuntimeError as e:  # Failed tiles, the mosaics whose tiles were all written are still registered
+                failures = str(e)
+            finally:
+                detach()
+                for batch in batches:
+                    rmtree(batch["work_dir"], ignore_errors=True)
+                    if cancel.is_set():
+                        clean_intermediates(batch["out_tile_folder"])
+            SetProgressorLabel("Waiting for Mosaic Dataset registration...")
+            for batch, registration in registrations:
+                try:
+                    registration.result()
+                except Exception as e:
+                    AddError("Mosaic Dataset registration failed for Tiles of {0}: {1}".format(batch["mosaic"], e))
+                    print("Mosaic Dataset registration failed for Tiles of {0}: {1}".format(batch["mosaic"], e))
+                    continue
+                AddMessage("Mosaic Dataset created for Tiles of {0}".format(batch["mosaic"]))
+            if failures:
+                AddError(failures)
+                print(failures)
         ResetProgressor()
         CheckInExtension("ImageAnalyst")
     except LicenseError:
@@ -97,8 +180,13 @@ if __name__ == "__main__":
         num_bands = 3
         product_definition = "NATURAL_COLOR_RGB"
         product_band_definitions = "Red 630 690;Green 530 570;Blue 440 510"
+        memory_budget = 24000  # MB available to tile workers, 0 processes tiles one at a time
+        max_workers = 0  # 0 uses all cores
+        queue_dir = ""  # Shared folder work queue for multi-process / multi-host runs, "" runs locally
+        dry_run = False  # Only report tile categories, output size and estimated time
+        metrics_file = ""  # Progress metrics rewritten during the run, .json or .prom (Prometheus text)
     else:
-        from arcpy import GetParameterAsText, GetParameter
+        from arcpy import GetParameterAsText, GetParameter, GetArgumentCount
         in_mosaic_gdb = GetParameterAsText(0)
         in_texture = GetParameterAsText(1)
         in_polygon = GetParameterAsText(2)
@@ -109,4 +197,16 @@ if __name__ == "__main__":
         num_bands = GetParameter(7)
         product_definition = GetParameterAsText(8)
         product_band_definitions = GetParameterAsText(9)
-    main()
+        # Parameters added after the published toolbox are only read when the tool defines them
+        argument_count = GetArgumentCount()
+        # MB available to tile workers, 0 processes tiles one at a time
+        memory_budget = GetParameter(10) if argument_count > 10 else 0
+        max_workers = GetParameter(11) if argument_count > 11 else 0  # 0 uses all cores
+        # Shared folder work queue for multi-process / multi-host runs
+        queue_dir = GetParameterAsText(12) if argument_count > 12 else ""
+        # Only report tile categories, output size and estimated time
+        dry_run = GetParameter(13) if argument_count > 13 else False
+        # Progress metrics rewritten during the run, .json or .prom
+        metrics_file = GetParameterAsText(14) if argument_count > 14 else ""
+    main(in_mosaic_gdb, in_texture, in_polygon, out_folder, method, blur_distance, pixel_depth, num_bands,
+         product_definition, product_band_definitions, memory_budget, max_workers, queue_dir, dry_run, metrics_file)
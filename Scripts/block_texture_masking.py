@@ -0,0 +1,239 @@
+# ----------------------------------------------------------------------------------------------------
+# Name:        block_texture_masking.py
+# Purpose:     Process for applying Seamless Textures to polygon masked areas directly on source orthos
+#              - Reads, masks, textures and writes the ortho in windowed blocks
+#              - Replaces the split (batch_create_tiled_ortho_mosaics) / texture / re-mosaic passes
+# Authors:     Geoff Taylor | Solution Engineer | Imagery & Remote Sensing
+# Created:     10/19/2026
+# Copyright:   (c) Esri 2026
+# Licence:     Apache Version 2.0
+# -----------------------------------------------------------------------------------------------------
+
+from os import path, makedirs, listdir
+from math import ceil
+
+
+def iter_blocks(height, width, block_size, halo=0):
+    # Yields (row, col, nrows, ncols, halo_window) for each block of a height x width raster.
+    # halo_window is the (row, col, nrows, ncols) read window grown by halo pixels and clamped to the raster.
+    for row in range(0, height, block_size):
+        nrows = min(block_size, height - row)
+        for col in range(0, width, block_size):
+            ncols = min(block_size, width - col)
+            h_row = max(row - halo, 0)
+            h_col = max(col - halo, 0)
+            h_nrows = min(row + nrows + halo, height) - h_row
+            h_ncols = min(col + ncols + halo, width) - h_col
+            yield row, col, nrows, ncols, (h_row, h_col, h_nrows, h_ncols)
+
+
+def blur_halo(method, blur_distance):
+    # Gaussian kernels are effectively zero beyond 3 sigma
+    if method == "None" or not blur_distance:
+        return 0
+    return int(ceil(3 * float(blur_distance)))
+
+
+def load_texture(in_texture, tile_size):
+    from PIL import Image
+    from numpy import asarray
+    texture = Image.open(in_texture).convert("RGB").resize((tile_size, tile_size), Image.LANCZOS)
+    return asarray(texture)
+
+
+def tile_texture(texture, row, col, nrows, ncols, row_origin=0, col_origin=0):
+    # Window of the seamless texture repeated across the map. row_origin / col_origin are the ortho's first
+    # pixel in map cells (see map_origin), so adjacent orthos continue the same texture grid without a seam.
+    from numpy import arange, ix_
+    t_height, t_width = texture.shape[:2]
+    rows = arange(row_origin + row, row_origin + row + nrows) % t_height
+    cols = arange(col_origin + col, col_origin + col + ncols) % t_width
+    return texture[ix_(rows, cols)]
+
+
+def map_origin(x_min, y_max, cell_width, cell_height):
+    # (row, col) of an ortho's upper left pixel on the map wide cell grid, rows increase southward
+    return -int(round(y_max / cell_height)), int(round(x_min / cell_width))
+
+
+def blend_block(rgb, keep, texture, method, blur_distance, crop):
+    # Composite texture into rgb where keep == 0. keep (255 = keep source pixel) covers the halo window,
+    # crop is the (row, col, nrows, ncols) of the block inside that window.
+    from PIL import Image, ImageFilter
+    from numpy import asarray, uint8
+    r, c, nrows, ncols = crop
+    mask = Image.fromarray(keep.astype(uint8), "L")
+    if method in ("GaussianBlur", "BoxBlur"):  # matches fill_masked_image.mask_image
+        mask = mask.filter(ImageFilter.GaussianBlur(blur_distance))
+    mask = mask.crop((c, r, c + ncols, r + nrows))
+    if mask.getextrema() == (255, 255):  # Nothing to texture in this block
+        return rgb
+    im = Image.composite(Image.fromarray(rgb, "RGB"), Image.fromarray(texture, "RGB"), mask)
+    return asarray(im)
+
+
+def rasterize_polygon(in_raster, in_polygon, out_mask):
+    from arcpy import env, EnvManager
+    from arcpy.conversion import PolygonToRaster
+    from create_mask import image_extent
+    env.overwriteOutput = True
+    with EnvManager(cellSize=in_raster, extent=image_extent(in_raster), snapRaster=in_raster):
+        PolygonToRaster(in_polygon, "OBJECTID", out_mask, "CELL_CENTER", "", in_raster)
+    return out_mask
+
+
+def block_texture_masking(in_raster, in_texture, in_polygon, out_raster, tile_size, block_size, method,
+                          blur_distance):
+    from arcpy import Raster
+    from arcpy.management import Delete
+    from numpy import where, uint8, ascontiguousarray
+    from pathlib import Path
+
+    src = Raster(in_raster)
+    cell_width = src.meanCellWidth
+    cell_height = src.meanCellHeight
+    x_min = src.extent.XMin
+    y_max = src.extent.YMax
+
+    # Rasterize the polygons once for the whole ortho, blocks read their window of it below
+    temp_mask_raster = path.join(path.dirname(out_raster), Path(out_raster).stem + "_mask.tif")
+    mask_src = Raster(rasterize_polygon(in_raster, in_polygon, temp_mask_raster))
+    mask_nodata = mask_src.noDataValue
+
+    texture = load_texture(in_texture, tile_size)
+    row_origin, col_origin = map_origin(x_min, y_max, cell_width, cell_height)
+    out = Raster(src.getRasterInfo())
+    halo = blur_halo(method, blur_distance)
+
+    def read(raster, window):
+        # Pixel indices, not map coordinates: block edges fall on cell edges where float error picks a neighbour.
+        # The mask is rasterized snapped to in_raster, so the same indices address it.
+        row, col, nrows, ncols = window
+        return raster.read(upper_left_corner=(col, row), ncols=ncols, nrows=nrows)
+
+    for row, col, nrows, ncols, window in iter_blocks(src.height, src.width, block_size, halo):
+        block = (row, col, nrows, ncols)
+        rgb = read(src, block)
+        mask = read(mask_src, window)
+        if mask.ndim == 3:
+            mask = mask[:, :, 0]
+        keep = where(mask == mask_nodata, 255, 0).astype(uint8)
+        crop = (row - window[0], col - window[1], nrows, ncols)
+        if keep.min() < 255:
+            rgb_bands = ascontiguousarray(rgb[:, :, :3]).astype(uint8)
+            texture_block = tile_texture(texture, row, col, nrows, ncols, row_origin, col_origin)
+            rgb[:, :, :3] = blend_block(rgb_bands, keep, texture_block, method, blur_distance, crop)
+        out.write(rgb, upper_left_corner=(col, row))
+    out.save(out_raster)
+    del mask_src
+    Delete(temp_mask_raster)  # Delete Intermediate Data
+    return out_raster
+
+
+def batch_block_texture_masking(in_folder, image_format, in_texture, in_polygon, out_folder, tile_size, block_size,
+                                method, blur_distance, build_mosaic, num_bands, pixel_depth, product_definition,
+                                product_band_definitions):
+    from arcpy import Describe, Exists, SetProgressor, SetProgressorLabel, SetProgressorPosition, ResetProgressor
+    from arcpy.management import BuildPyramids, CreateFileGDB, CreateMosaicDataset, AddRastersToMosaicDataset
+
+    if not path.exists(out_folder):
+        makedirs(out_folder)
+    images = [f for f in listdir(in_folder) if f.lower().endswith(image_format.lower())]
+    num_images = len(images)
+    out_rasters = []
+    SetProgressor("step", "Begin Processing Files...", 0, num_images, 1)
+    for count, fileName in enumerate(images):
+        print("processing Image {0} of {1}".format(count + 1, num_images))
+        SetProgressorLabel("Texturing {0} in blocks...".format(fileName))
+        out_raster = path.join(out_folder, path.splitext(fileName)[0] + "_design.tif")
+        block_texture_masking(path.join(in_folder, fileName), in_texture, in_polygon, out_raster, tile_size,
+                              block_size, method, blur_distance)
+        BuildPyramids(out_raster, -1, "NONE", "NEAREST", "DEFAULT", 75, "OVERWRITE")
+        out_rasters.append(out_raster)
+        SetProgressorPosition()
+    if build_mosaic and out_rasters:
+        # Optional: register the textured orthos, no re-tiling required
+        SetProgressorLabel("Creating Mosaic Dataset for Textured Orthos...")
+        fileGDB = path.join(out_folder, "ortho_mosaics.gdb")
+        if not Exists(fileGDB):
+            CreateFileGDB(out_folder, "ortho_mosaics.gdb")
+        mosaic_name = "textured"
+        sr = Describe(out_rasters[0]).spatialReference
+        CreateMosaicDataset(fileGDB, mosaic_name, sr, num_bands, pixel_depth, product_definition,
+                            product_band_definitions)
+        AddRastersToMosaicDataset(path.join(fileGDB, mosaic_name), "Raster Dataset", ";".join(out_rasters),
+                                  "UPDATE_CELL_SIZES", "UPDATE_BOUNDARY", "NO_OVERVIEWS", None, 0, 1500, None, '',
+                                  "SUBFOLDERS", "ALLOW_DUPLICATES", "NO_PYRAMIDS", "NO_STATISTICS", "NO_THUMBNAILS",
+                                  '', "NO_FORCE_SPATIAL_REFERENCE", "NO_STATISTICS", None, "NO_PIXEL_CACHE")
+    ResetProgressor()
+    return out_rasters
+
+
+def main(in_folder, image_format, in_texture, in_polygon, out_folder, tile_size, block_size, method, blur_distance,
+         build_mosaic, num_bands, pixel_depth, product_definition, product_band_definitions):
+    from arcpy import CheckExtension, CheckOutExtension, CheckInExtension, ExecuteError, GetMessages, AddError
+
+    class LicenseError(Exception):
+        pass
+
+    try:
+        if CheckExtension("ImageAnalyst") == "Available":
+            CheckOutExtension("ImageAnalyst")
+        else:
+            # raise a custom exception
+            raise LicenseError
+        try:
+            from PIL import Image
+        except ModuleNotFoundError:
+            AddError("PILLOW Library Not Detected. Install using Python Manager in ArcGIS Pro")
+            print("PILLOW Library Not Detected. Install using Python Manager in ArcGIS Pro")
+            exit()
+        if path.normcase(path.abspath(out_folder)) == path.normcase(path.abspath(in_folder)):
+            AddError("outFolder cannot be the same folder/directory as the input orthos")
+            exit()
+        batch_block_texture_masking(in_folder, image_format, in_texture, in_polygon, out_folder, tile_size,
+                                    block_size, method, blur_distance, build_mosaic, num_bands, pixel_depth,
+                                    product_definition, product_band_definitions)
+        CheckInExtension("ImageAnalyst")
+    except LicenseError:
+        AddError("Image Analyst license is unavailable")
+        print("Image Analyst license is unavailable")
+    except ExecuteError:
+        print(GetMessages(2))
+
+
+if __name__ == "__main__":
+    debug = False
+    if debug:
+        in_folder = r'C:\Users\geof7015\Documents\ArcGIS\Projects\ArcGIS_Image_Designer\Galveston\Data\NAIP'
+        image_format = "jp2"
+        in_texture = r'C:\Users\geof7015\Documents\ArcGIS\Projects\ArcGIS_Image_Designer\Textures\Processed\dune_vegetation_seamless.jpg'
+        in_polygon = r'C:\Users\geof7015\Documents\ArcGIS\Projects\ArcGIS_Image_Designer\Galveston\Data\Esri_Processed\Dune_Outline.gdb\Galveston_Dune_Grass_Polys_Projected'
+        out_folder = r'C:\Users\geof7015\Documents\ArcGIS\Projects\ArcGIS_Image_Designer\scratch_blocks'
+        tile_size = 1000  # Texture repeat in Pixels (same as pixel_size of batch_create_tiled_ortho_mosaics)
+        block_size = 2048  # Processing window in Pixels
+        method = "GaussianBlur"  # "GaussianBlur", "BoxBlur", "None"
+        blur_distance = 2  # Distance in Pixels
+        build_mosaic = True
+        pixel_depth = "8_BIT_UNSIGNED"
+        num_bands = 3
+        product_definition = "NATURAL_COLOR_RGB"
+        product_band_definitions = "Red 630 690;Green 530 570;Blue 440 510"
+    else:
+        from arcpy import GetParameterAsText, GetParameter
+        in_folder = GetParameterAsText(0)
+        image_format = GetParameterAsText(1)
+        in_texture = GetParameterAsText(2)
+        in_polygon = GetParameterAsText(3)
+        out_folder = GetParameterAsText(4)
+        tile_size = GetParameter(5)  # Texture repeat in Pixels
+        block_size = GetParameter(6)  # Processing window in Pixels
+        method = GetParameterAsText(7)  # "GaussianBlur", "BoxBlur", "None"
+        blur_distance = GetParameter(8)  # Distance in Pixels
+        build_mosaic = GetParameter(9)
+        pixel_depth = GetParameterAsText(10)
+        num_bands = GetParameter(11)
+        product_definition = GetParameterAsText(12)
+        product_band_definitions = GetParameterAsText(13)
+    main(in_folder, image_format, in_texture, in_polygon, out_folder, tile_size, block_size, method, blur_distance,
+         build_mosaic, num_bands, pixel_depth, product_definition, product_band_definitions)
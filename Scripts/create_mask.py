@@ -70,7 +70,21 @@ def generate_squares(in_polygon, in_raster):
     del cursor
 
 
-def create_mask(in_raster, in_polygon, out_raster):
+def load_clipped_polygons(clipped_polygons, in_raster, out_features):
+    # Write polygons pre-clipped to the tile (Esri JSON from polygon_partition, already projected to the
+    # ortho's spatial reference) to an in_memory feature class in that spatial reference
+    import json
+    from os import path
+    from arcpy import Describe, AsShape, da
+    from arcpy.management import CreateFeatureclass
+    workspace, name = path.split(out_features)
+    CreateFeatureclass(workspace, name, "POLYGON", spatial_reference=Describe(in_raster).spatialReference)
+    with da.InsertCursor(out_features, ['SHAPE@']) as cursor:
+        for geometry in clipped_polygons:
+            cursor.insertRow([AsShape(json.loads(geometry), True)])  # AsShape takes the Esri JSON dict
+
+
+def create_mask(in_raster, in_polygon, out_raster, clipped_polygons=None):
     from os import path
     from arcpy import env, EnvManager, ResetEnvironments, AddError
     from arcpy.ia import Con, IsNull
@@ -81,7 +95,10 @@ def create_mask(in_raster, in_polygon, out_raster):
 
     # Clip raster and apply geometries at Bottom-left ant top-right corners to ensure Raster covers Ortho tile extent
     polygon_clipped = path.join("in_memory", "polygon_clipped")
-    Clip(in_polygon, raster_extent_polygon(in_raster), polygon_clipped)
+    if clipped_polygons is None:
+        Clip(in_polygon, raster_extent_polygon(in_raster), polygon_clipped)
+    else:
+        load_clipped_polygons(clipped_polygons, in_raster, polygon_clipped)
     generate_squares(polygon_clipped, in_raster)
 
     def is_masked(in_polygon):
@@ -141,7 +158,7 @@ def create_mask(in_raster, in_polygon, out_raster):
     ResetEnvironments()
 
 
-def main():
+def main(in_raster, in_polygon, out_raster):
     from arcpy import CheckExtension, CheckOutExtension, CheckInExtension, ExecuteError, GetMessages
 
     class LicenseError(Exception):
@@ -173,4 +190,4 @@ if __name__ == "__main__":
         in_raster = GetParameterAsText(0)
         in_polygon = GetParameterAsText(1)
         out_raster = GetParameterAsText(2)
-    main()
+    main(in_raster, in_polygon, out_raster)
@@ -23,51 +23,51 @@ def copy_auxillary_files(in_file, out_file):
         print("File Type for transferring auxillary data not supported")
 
 
+def composite_texture(rgb_image, mask, texture, method, blur_distance):
+    # Blend step of mask_image on PIL images: texture where mask is 0, source image where 255.
+    # The mask is blurred at its own resolution, then mask and texture are resized to the image.
+    from PIL import Image, ImageFilter
+    if method in ("GaussianBlur", "BoxBlur"):
+        mask = mask.filter(ImageFilter.GaussianBlur(blur_distance))
+    return Image.composite(rgb_image, texture.resize(rgb_image.size), mask.resize(rgb_image.size))
+
+
 def mask_image(in_image,
                in_mask,
                in_texture,
                out_image,
                method,
-               blur_distance):
+               blur_distance,
+               backend=None):
     from os import remove
     from os.path import exists
-    from PIL import Image, ImageFilter
+    from PIL import Image
     # Begin Processing Image
     rgb_image = Image.open(in_image)
-    mask = Image.open(in_mask).convert('L').resize(rgb_image.size)
+    source_mask = Image.open(in_mask).convert('L')
+    mask = source_mask.resize(rgb_image.size)
     masking_value = 0
     pixels = [mask.getpixel((i, j)) for j in range(mask.height) for i in range(mask.width)]
     if masking_value in pixels:  # If pixel in mask contain masking value
         # Check if the input texture map is already in PIL Open format... Required for time processing tool & Script.
+        # NumPy arrays (crops of shared_texture) are also accepted.
+        if hasattr(in_texture, "__array_interface__") and not isinstance(in_texture, Image.Image):
+            in_texture = Image.fromarray(in_texture, "RGB")
         try:
-            texture_mask = Image.open(in_texture).resize(rgb_image.size)
+            texture_mask = Image.open(in_texture)
         except:
-            texture_mask = in_texture.resize(rgb_image.size)
-        if method == "BoxBlur":
-            mask_blur = Image.open(in_mask).convert('L').filter(ImageFilter.GaussianBlur(blur_distance)).resize(
-                rgb_image.size)
-            im = Image.composite(rgb_image, texture_mask, mask_blur)
-        if method == "GaussianBlur":
-            mask_blur = Image.open(in_mask).convert('L').filter(ImageFilter.GaussianBlur(blur_distance)).resize(
-                rgb_image.size)
-            im = Image.composite(rgb_image, texture_mask, mask_blur)
-        if method == "None":
-            im = Image.composite(rgb_image, texture_mask, mask)
+            texture_mask = in_texture
+        im = composite_texture(rgb_image, source_mask, texture_mask, method, blur_distance)
         if exists(out_image):
             remove(out_image)
         im.save(out_image)
         copy_auxillary_files(in_image, out_image)
     else:
-        from arcpy.management import CopyRaster
-        if ".jpg" in out_image.lower():
-            CopyRaster(in_image, out_image, '', None, "256", "NONE", "NONE", "8_BIT_UNSIGNED", "NONE", "NONE", "JPEG",
-                       "NONE", "CURRENT_SLICE", "NO_TRANSPOSE")
-        if ".tif" in out_image.lower():
-            CopyRaster(in_image, out_image, '', None, "256", "NONE", "NONE", "8_BIT_UNSIGNED", "NONE", "NONE", "TIFF",
-                       "NONE", "CURRENT_SLICE", "NO_TRANSPOSE")
+        from raster_backend import get_backend
+        get_backend(backend).copy_raster(in_image, out_image)
 
 
-def main():
+def main(in_image, in_mask, in_texture, out_image, method, blur_distance):
     from arcpy import CheckExtension, CheckOutExtension, CheckInExtension, ExecuteError, GetMessages, AddMessage
     from arcpy.management import BuildPyramids
 
@@ -132,4 +132,4 @@ if __name__ == '__main__':
                 exit()
 
         AddMessage(blur_distance)
-    main()
+    main(in_image, in_mask, in_texture, out_image, method, blur_distance)
@@ -0,0 +1,115 @@
+# ----------------------------------------------------------------------------------------------------
+# Name:        generalize_polygons.py
+# Purpose:     Resolution aware simplification of mask polygons before masking
+#              - Vertices that deviate less than a fraction of the ortho cell size from the simplified outline
+#                are removed before clipping / rasterization; only cells whose center lies within that
+#                distance of a boundary can change
+#              - Results are cached per (polygon geometries, tolerance) and reused by later runs
+# Authors:     Geoff Taylor | Solution Engineer | Imagery & Remote Sensing
+# Created:     10/19/2026
+# Copyright:   (c) Esri 2026
+# Licence:     Apache Version 2.0
+# -----------------------------------------------------------------------------------------------------
+
+from hashlib import sha1
+from os import path
+
+TOLERANCE_FRACTION = 0.25  # Of the cell size
+
+
+def cell_size_of(i_list):
+    # Finest cell size in the tile catalog ([path, XMin, XMax, YMin, YMax, height, width])
+    return min(min((i[2] - i[1]) / i[6], (i[4] - i[3]) / i[5]) for i in i_list)
+
+
+def cache_name(*parts):
+    return "generalized_" + sha1(repr(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def point_line_distance(p, a, b):
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    if dx == 0 and dy == 0:
+        return ((p[0] - a[0]) ** 2 + (p[1] - a[1]) ** 2) ** 0.5
+    return abs(dy * p[0] - dx * p[1] + b[0] * a[1] - b[1] * a[0]) / (dx * dx + dy * dy) ** 0.5
+
+
+def simplify_ring(ring, tolerance):
+    # Douglas-Peucker on a closed ring, rings that would collapse below a triangle are kept as is
+    if len(ring) <= 4:
+        return ring
+    keep = [False] * len(ring)
+    keep[0] = keep[-1] = True
+    # Split at the vertex farthest from the start so the closed ring does not degenerate to one segment
+    far = max(range(1, len(ring) - 1), key=lambda n: point_line_distance(ring[n], ring[0], ring[0]))
+    keep[far] = True
+    stack = [(0, far), (far, len(ring) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distance, index = max((point_line_distance(ring[n], ring[first], ring[last]), n)
+                              for n in range(first + 1, last))
+        if distance > tolerance:
+            keep[index] = True
+            stack.extend([(first, index), (index, last)])
+    simplified = [p for p, k in zip(ring, keep) if k]
+    return simplified if len(simplified) >= 4 else ring
+
+
+def simplify_polygons(polygons, tolerance):
+    # Rings are simplified independently, any gap or overlap this opens between neighbouring polygons is
+    # narrower than the tolerance
+    return [[simplify_ring(ring, tolerance) for ring in rings] for rings in polygons]
+
+
+def generalize_geojson(in_polygon, cell_size, fraction=TOLERANCE_FRACTION, cache_folder=None):
+    import json
+    from tempfile import gettempdir
+    from raster_backend import read_polygons
+    cache_folder = cache_folder or path.join(gettempdir(), "ArcGIS_Image_Designer")
+    name = cache_name(path.abspath(in_polygon), path.getmtime(in_polygon), path.getsize(in_polygon), cell_size,
+                      fraction)
+    out_polygon = path.join(cache_folder, name + ".geojson")
+    if not path.exists(out_polygon):
+        from os import makedirs, replace
+        makedirs(cache_folder, exist_ok=True)
+        polygons = simplify_polygons(read_polygons(in_polygon), cell_size * fraction)
+        temp = out_polygon + ".tmp"
+        with open(temp, "w") as f:
+            json.dump({"type": "MultiPolygon", "coordinates": polygons}, f)
+        replace(temp, out_polygon)
+    return out_polygon
+
+
+def geometry_digest(in_polygon):
+    # Changes with any edit to the geometries, including vertex moves that keep the feature count and extent
+    from arcpy import da
+    digest = sha1()
+    with da.SearchCursor(in_polygon, ["SHAPE@WKB"]) as cursor:
+        for row in cursor:
+            digest.update(bytes(row[0] or b""))
+    return digest.hexdigest()
+
+
+def linear_unit(cell_size, in_raster):
+    # Tolerance as a linear unit string, so SimplifyPolygon converts it from the ortho's units into those of the
+    # feature class (a bare number would be read in the feature class' units, e.g. degrees)
+    from arcpy import Describe
+    sr = Describe(in_raster).spatialReference
+    if sr.type == "Geographic":
+        return "{0} DecimalDegrees".format(cell_size)
+    return "{0} Meters".format(cell_size * sr.metersPerUnit)
+
+
+def generalize_feature_class(in_polygon, cell_size, in_raster, fraction=TOLERANCE_FRACTION, cache_gdb=None):
+    from arcpy import Exists, env
+    from arcpy.cartography import SimplifyPolygon
+    cache_gdb = cache_gdb or env.scratchGDB
+    tolerance = linear_unit(cell_size * fraction, in_raster)
+    name = cache_name(in_polygon, geometry_digest(in_polygon), tolerance)
+    out_polygon = path.join(cache_gdb, name)
+    if not Exists(out_polygon):
+        # RESOLVE_ERRORS keeps the simplified polygons topologically valid
+        SimplifyPolygon(in_polygon, out_polygon, "POINT_REMOVE", tolerance, 0, "RESOLVE_ERRORS", "NO_KEEP")
+    return out_polygon
@@ -0,0 +1,150 @@
+# ----------------------------------------------------------------------------------------------------
+# Name:        memory_scheduler.py
+# Purpose:     Memory budget aware scheduling of texture_image jobs across worker processes
+#              - Estimates the peak bytes of each tile job from the tile catalog
+#              - Admits jobs while the sum of running estimates fits the budget, smallest tiles first
+# Authors:     Geoff Taylor | Solution Engineer | Imagery & Remote Sensing
+# Created:     10/19/2026
+# Copyright:   (c) Esri 2026
+# Licence:     Apache Version 2.0
+# -----------------------------------------------------------------------------------------------------
+
+from math import ceil
+
+MB = 1024 * 1024
+PROCESS_OVERHEAD = 400 * MB  # Interpreter + arcpy import per worker process
+RGB_BYTES = 4  # PIL stores RGB images as 4 bytes per pixel
+L_BYTES = 1
+LIST_BYTES = 8  # One pointer per pixel for the mask pixel list in fill_masked_image.mask_image
+
+
+def estimate_job_bytes(height, width, max_height, max_width, blur_distance, texture_size=None, shared_texture=False):
+    tile = height * width
+    # Full size resized texture (plus the decoded source texture when its size is known) and its crop.
+    # With shared_texture the resized texture lives once in the page cache, workers only copy their crop.
+    texture = tile * RGB_BYTES
+    if not shared_texture:
+        texture += max_height * max_width * RGB_BYTES
+    if texture_size and not shared_texture:
+        texture += texture_size[0] * texture_size[1] * RGB_BYTES
+    # Source tile, texture resized to tile, composite output
+    images = 3 * tile * RGB_BYTES
+    # Mask, blurred mask (blur works on a copy padded by the blur radius) and mask pixel list
+    pad = 2 * int(ceil(3 * float(blur_distance or 0)))
+    masks = 2 * tile * L_BYTES + (height + pad) * (width + pad) * L_BYTES + tile * LIST_BYTES
+    return texture + images + masks
+
+
+def estimate_catalog(i_list, blur_distance, texture_size=None, shared_texture=False):
+    max_height = max(i_list, key=lambda x: x[5])[5]
+    max_width = max(i_list, key=lambda x: x[6])[6]
+    return [estimate_job_bytes(i[5], i[6], max_height, max_width, blur_distance, texture_size, shared_texture)
+            for i in i_list]
+
+
+def texture_size_of(in_texture):
+    try:
+        from PIL import Image
+        with Image.open(in_texture) as img:  # Reads the header only
+            return img.size
+    except Exception:
+        return None
+
+
+def set_worker_executable():
+    # Inside ArcGIS Pro sys.executable is ArcGISPro.exe, worker processes must be started with python.exe
+    import sys
+    from os import path
+    import multiprocessing
+    if not path.basename(sys.executable).lower().startswith("python"):
+        multiprocessing.set_executable(path.join(sys.exec_prefix, "python.exe"))
+
+
+def init_worker(backend):
+    # ProcessPoolExecutor initializer: set the worker process up for backend (e.g. check out Image Analyst)
+    from multiprocessing.util import Finalize
+    from raster_backend import get_backend
+    backend = get_backend(backend)
+    backend.init_worker()
+    # Pool workers leave through multiprocessing's exit handlers, not atexit
+    Finalize(None, backend.release_worker, exitpriority=10)
+
+
+class MemoryScheduler:
+
+    def __init__(self, memory_budget, max_workers=None, process_overhead=PROCESS_OVERHEAD):
+        from os import cpu_count
+        self.memory_budget = memory_budget
+        self.max_workers = max_workers or cpu_count() or 1
+        self.process_overhead = process_overhead
+        self.in_use = 0
+        self.running = {}
+
+    def fits(self, estimate):
+        return self.in_use + estimate + self.process_overhead <= self.memory_budget
+
+    def admit(self, pending):
+        # pending is sorted by (priority, estimate), so within a priority small tiles are packed together first
+        # and smaller jobs further down backfill memory a large job cannot use.
+        # A job larger than the whole budget is still run, but alone.
+        admitted = []
+        n = 0
+        while n < len(pending) and len(self.running) + len(admitted) < self.max_workers:
+            estimate = pending[n][0]
+            if self.fits(estimate) or not (self.running or admitted):
+                admitted.append(pending.pop(n))
+                self.in_use += estimate + self.process_overhead
+            else:
+                n += 1
+        return admitted
+
+    def release(self, estimate):
+        self.in_use -= estimate + self.process_overhead
+
+    def pool_size(self, estimates):
+        # Python 3.6/3.7 spawn every pool worker on the first submit and each costs process_overhead whether or
+        # not it is given a job, so the pool is sized to what the budget holds with the smallest jobs
+        if not estimates:
+            return 1
+        return max(1, min(self.max_workers, int(self.memory_budget // (self.process_overhead + min(estimates)))))
+
+    def run(self, func, jobs, on_done=None, priorities=None, cancelled=None, on_error=None, backend=None):
+        # jobs: list of (estimate, args). func(*args) runs in a worker process. Returns results in job order.
+        # func must be importable by its module name, spawned workers cannot import the tool script's __main__.
+        # With backend (name) each worker process runs backend.init_worker() before its first job.
+        # Lower priorities are admitted first (e.g. the mosaic a tile belongs to), all 0 by default.
+        # Once cancelled() is true no further jobs are admitted, running jobs finish and the others stay None.
+        # With on_error(index, traceback) a failed job is reported and the others go on, otherwise run raises.
+        from traceback import format_exception
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+        set_worker_executable()
+        priorities = priorities or [0] * len(jobs)
+        pending = sorted(((priorities[index], estimate, index, args) for index, (estimate, args) in enumerate(jobs)),
+                         key=lambda x: x[:3])
+        pending = [(estimate, (index, args)) for _, estimate, index, args in pending]
+        results = [None] * len(jobs)
+        self.max_workers = self.pool_size([estimate for estimate, _ in jobs])
+        initializer = {"initializer": init_worker, "initargs": (backend,)} if backend else {}
+        with ProcessPoolExecutor(max_workers=self.max_workers, **initializer) as executor:
+            while pending or self.running:
+                if cancelled and cancelled():
+                    del pending[:]
+                    if not self.running:
+                        break
+                for estimate, (index, args) in self.admit(pending):
+                    self.running[executor.submit(func, *args)] = (estimate, index)
+                done, _ = wait(list(self.running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    estimate, index = self.running.pop(future)
+                    self.release(estimate)
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        if on_error is None:
+                            raise
+                        # The worker's traceback is chained as the cause
+                        on_error(index, "".join(format_exception(type(e), e, e.__traceback__)))
+                        continue
+                    if on_done:
+                        on_done(index, results[index])
+        return results
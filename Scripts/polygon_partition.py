@@ -0,0 +1,129 @@
+# ----------------------------------------------------------------------------------------------------
+# Name:        polygon_partition.py
+# Purpose:     Single pass partitioning of mask polygons onto the tile grid
+#              - Polygons are read once, each feature is assigned to the tiles its extent overlaps through a
+#                grid index and clipped to each of those tiles in memory
+#              - Replaces one Clip of the whole feature class per tile (O(tiles x features))
+# Authors:     Geoff Taylor | Solution Engineer | Imagery & Remote Sensing
+# Created:     10/19/2026
+# Copyright:   (c) Esri 2026
+# Licence:     Apache Version 2.0
+# -----------------------------------------------------------------------------------------------------
+
+from math import floor
+
+
+class TileIndex:
+    # Buckets the tile extents of an i_list ([path, XMin, XMax, YMin, YMax, ...]) on a regular grid
+
+    def __init__(self, i_list):
+        self.tiles = i_list
+        self.x0 = min(i[1] for i in i_list)
+        self.y0 = min(i[3] for i in i_list)
+        self.cell_x = max(i[2] - i[1] for i in i_list) or 1.0
+        self.cell_y = max(i[4] - i[3] for i in i_list) or 1.0
+        self.buckets = {}
+        for n, i in enumerate(i_list):
+            for key in self.keys(i[1], i[2], i[3], i[4]):
+                self.buckets.setdefault(key, []).append(n)
+
+    def keys(self, x_min, x_max, y_min, y_max):
+        for col in range(int(floor((x_min - self.x0) / self.cell_x)), int(floor((x_max - self.x0) / self.cell_x)) + 1):
+            for row in range(int(floor((y_min - self.y0) / self.cell_y)),
+                             int(floor((y_max - self.y0) / self.cell_y)) + 1):
+                yield col, row
+
+    def overlapping(self, x_min, x_max, y_min, y_max):
+        # Tiles whose extent overlaps the given extent
+        found = set()
+        for key in self.keys(x_min, x_max, y_min, y_max):
+            for n in self.buckets.get(key, []):
+                if n in found:
+                    continue
+                i = self.tiles[n]
+                if x_min < i[2] and x_max > i[1] and y_min < i[4] and y_max > i[3]:
+                    found.add(n)
+        return [self.tiles[n] for n in sorted(found)]
+
+
+def ring_extent(ring):
+    xs = [p[0] for p in ring]
+    ys = [p[1] for p in ring]
+    return min(xs), max(xs), min(ys), max(ys)
+
+
+def clip_ring(ring, x_min, x_max, y_min, y_max):
+    # Sutherland-Hodgman clip of a ring against a rectangle
+    def clip_edge(points, inside, intersect):
+        out = []
+        for n, current in enumerate(points):
+            previous = points[n - 1]
+            if inside(current):
+                if not inside(previous):
+                    out.append(intersect(previous, current))
+                out.append(current)
+            elif inside(previous):
+                out.append(intersect(previous, current))
+        return out
+
+    def at_x(x):
+        return lambda a, b: (x, a[1] + (b[1] - a[1]) * (x - a[0]) / (b[0] - a[0]))
+
+    def at_y(y):
+        return lambda a, b: (a[0] + (b[0] - a[0]) * (y - a[1]) / (b[1] - a[1]), y)
+
+    points = [tuple(p[:2]) for p in ring]
+    if len(points) > 1 and points[0] == points[-1]:
+        points = points[:-1]
+    for inside, intersect in [(lambda p: p[0] >= x_min, at_x(x_min)), (lambda p: p[0] <= x_max, at_x(x_max)),
+                              (lambda p: p[1] >= y_min, at_y(y_min)), (lambda p: p[1] <= y_max, at_y(y_max))]:
+        if not points:
+            break
+        points = clip_edge(points, inside, intersect)
+    if len(points) < 3:
+        return None
+    return [list(p) for p in points + [points[0]]]
+
+
+def clip_polygon(rings, x_min, x_max, y_min, y_max):
+    exterior = clip_ring(rings[0], x_min, x_max, y_min, y_max)
+    if exterior is None:
+        return None
+    holes = [clip_ring(hole, x_min, x_max, y_min, y_max) for hole in rings[1:]]
+    return [exterior] + [hole for hole in holes if hole is not None]
+
+
+def partition_polygons(polygons, i_list):
+    # polygons: GeoJSON style coordinate lists (exterior ring then holes).
+    # Returns {tile path: [clipped polygons]} with an entry for every tile.
+    index = TileIndex(i_list)
+    partitions = {i[0]: [] for i in i_list}
+    for rings in polygons:
+        x_min, x_max, y_min, y_max = ring_extent(rings[0])
+        for i in index.overlapping(x_min, x_max, y_min, y_max):
+            clipped = clip_polygon(rings, i[1], i[2], i[3], i[4])
+            if clipped is not None:
+                partitions[i[0]].append(clipped)
+    return partitions
+
+
+def partition_feature_class(in_polygon, i_list):
+    # arcpy version of partition_polygons: one SearchCursor pass over in_polygon.
+    # Clipped geometries are returned as Esri JSON so they can be pickled / published to the work queue.
+    # The cursor projects the polygons to the orthos' spatial reference (as Clip did) so they compare with
+    # the tile extents.
+    from arcpy import da, Extent, Describe
+    index = TileIndex(i_list)
+    partitions = {i[0]: [] for i in i_list}
+    spatial_reference = Describe(i_list[0][0]).spatialReference
+    with da.SearchCursor(in_polygon, ["SHAPE@"], spatial_reference=spatial_reference) as cursor:
+        for row in cursor:
+            shape = row[0]
+            if shape is None:
+                continue
+            e = shape.extent
+            for i in index.overlapping(e.XMin, e.XMax, e.YMin, e.YMax):
+                clipped = shape.clip(Extent(i[1], i[3], i[2], i[4]))
+                if clipped is not None and clipped.area > 0:
+                    partitions[i[0]].append(clipped.JSON)
+    return partitions
@@ -0,0 +1,138 @@
+# ----------------------------------------------------------------------------------------------------
+# Name:        preview_texture_masking.py
+# Purpose:     Low resolution preview of Mosaic_Texture_Masking for choosing textures and blur settings
+#              - Runs the same mask / texture / blend steps on downsampled tiles (existing .ovr pyramid levels
+#                or JPEG draft decoding) and writes one mosaic-wide preview image with a world file
+#              - Blur distances are scaled to the preview resolution
+# Authors:     Geoff Taylor | Solution Engineer | Imagery & Remote Sensing
+# Created:     10/19/2026
+# Copyright:   (c) Esri 2026
+# Licence:     Apache Version 2.0
+# -----------------------------------------------------------------------------------------------------
+
+from os import path
+
+
+def pyramid_file(in_raster):
+    for ovr in [in_raster + ".ovr", path.splitext(in_raster)[0] + ".ovr"]:
+        if path.exists(ovr):
+            return ovr
+    return None
+
+
+def read_pyramid_level(in_raster, size):
+    # Smallest .ovr level that is still at least size, None when there is no usable pyramid
+    from PIL import Image
+    ovr = pyramid_file(in_raster)
+    if ovr is None:
+        return None
+    try:
+        levels = Image.open(ovr)
+        best = None
+        for frame in range(getattr(levels, "n_frames", 1)):
+            levels.seek(frame)
+            if levels.size[0] >= size[0] and levels.size[1] >= size[1]:
+                if best is None or levels.size[0] < best[1][0]:
+                    best = (frame, levels.size)
+        if best is None:
+            return None
+        levels.seek(best[0])
+        return levels.convert("RGB").resize(size, Image.BILINEAR)
+    except Exception:
+        return None  # Pyramid compression not readable by PIL, decode the tile instead
+
+
+def read_preview(in_raster, size, use_pyramids=True):
+    from PIL import Image
+    img = read_pyramid_level(in_raster, size) if use_pyramids else None
+    if img is None:
+        img = Image.open(in_raster)
+        img.draft("RGB", size)  # JPEG decodes directly at 1/2, 1/4 or 1/8 scale
+        img = img.convert("RGB").resize(size, Image.BILINEAR)
+    return img
+
+
+def preview_texture_masking(in_mosaic, in_texture, in_polygon, out_image, scale, method, blur_distance,
+                            use_pyramids=True, backend=None):
+    from PIL import Image
+    from Mosaic_Texture_Masking import get_images_and_stats, texture_clip_extent
+    from fill_masked_image import composite_texture
+    from raster_backend import get_backend, RasterInfo, rasterize_polygons
+    from generalize_polygons import cell_size_of
+    backend = get_backend(backend)
+
+    i_list, extent = get_images_and_stats(in_mosaic, backend)
+    XMin, XMax, YMin, YMax = extent
+    cell_size = cell_size_of(i_list) * scale
+    # Polygons generalized to the preview resolution, read once and clipped to the tiles
+    partitions = backend.partition_polygons(backend.generalize_polygons(in_polygon, cell_size, i_list[0][0]),
+                                            i_list)
+
+    def to_canvas(x, y):
+        return int(round((x - XMin) / cell_size)), int(round((YMax - y) / cell_size))
+
+    # Paste box of each tile from the rounded canvas coordinates of both edges, so neighbours share their edge
+    # whether or not scale divides the tile size
+    boxes = {i[0]: to_canvas(i[1], i[4]) + to_canvas(i[2], i[3]) for i in i_list}
+    max_height = max(max(box[3] - box[1] for box in boxes.values()), 1)
+    max_width = max(max(box[2] - box[0] for box in boxes.values()), 1)
+    texture = Image.open(in_texture).convert("RGB").resize((max_width, max_height), Image.LANCZOS)
+    preview_blur = float(blur_distance) / scale
+    canvas = Image.new("RGB", (int(round((XMax - XMin) / cell_size)), int(round((YMax - YMin) / cell_size))))
+
+    for i in i_list:
+        info = RasterInfo(*i[:7])
+        box = boxes[info.path]
+        size = (max(box[2] - box[0], 1), max(box[3] - box[1], 1))
+        rgb_image = read_preview(info.path, size, use_pyramids)
+        mask = rasterize_polygons(partitions[info.path], info, size)
+        if mask.getextrema()[0] == 0:  # Same blend as fill_masked_image.mask_image
+            texture_mask = texture.crop(texture_clip_extent(i[7], size[1], size[0], max_height, max_width))
+            rgb_image = composite_texture(rgb_image, mask, texture_mask, method, preview_blur)
+        canvas.paste(rgb_image, box[:2])
+
+    canvas.save(out_image)
+    from raster_backend import world_file
+    with open(world_file(out_image), "w") as f:
+        f.write("\n".join(str(v) for v in [cell_size, 0, 0, -cell_size, XMin + cell_size / 2.0,
+                                             YMax - cell_size / 2.0]) + "\n")
+    return out_image
+
+
+def main(in_mosaic, in_texture, in_polygon, out_image, scale, method, blur_distance, use_pyramids):
+    from arcpy import ExecuteError, GetMessages, AddError
+    try:
+        try:
+            from PIL import Image
+        except ModuleNotFoundError:
+            AddError("PILLOW Library Not Detected. Install using Python Manager in ArcGIS Pro")
+            print("PILLOW Library Not Detected. Install using Python Manager in ArcGIS Pro")
+            exit()
+        preview_texture_masking(in_mosaic, in_texture, in_polygon, out_image, scale, method, blur_distance,
+                                use_pyramids)
+    except ExecuteError:
+        print(GetMessages(2))
+
+
+if __name__ == "__main__":
+    debug = False
+    if debug:
+        in_mosaic = r'C:\Users\geof7015\Documents\ArcGIS\Projects\ArcGIS_Image_Designer\test\ortho_mosaic.gdb\tile_27_test'
+        in_texture = r'C:\Users\geof7015\Documents\ArcGIS\Projects\ArcGIS_Image_Designer\Textures\Processed\dune_vegetation_seamless.jpg'
+        in_polygon = r'C:\Users\geof7015\Documents\ArcGIS\Projects\ArcGIS_Image_Designer\Galveston\Data\Esri_Processed\Dune_Outline.gdb\Galveston_Dune_Grass_Polys_Projected'
+        out_image = r'C:\Users\geof7015\Documents\ArcGIS\Projects\ArcGIS_Image_Designer\test\preview.jpg'
+        scale = 8  # Preview pixel = scale x scale ortho pixels
+        method = "GaussianBlur"  # "GaussianBlur", "BoxBlur", "None"
+        blur_distance = 5  # Distance in full resolution Pixels
+        use_pyramids = True
+    else:
+        from arcpy import GetParameterAsText, GetParameter
+        in_mosaic = GetParameterAsText(0)
+        in_texture = GetParameterAsText(1)
+        in_polygon = GetParameterAsText(2)
+        out_image = GetParameterAsText(3)
+        scale = GetParameter(4)  # Preview pixel = scale x scale ortho pixels
+        method = GetParameterAsText(5)  # "GaussianBlur", "BoxBlur", "None"
+        blur_distance = GetParameter(6)  # Distance in full resolution Pixels
+        use_pyramids = GetParameter(7)
+    main(in_mosaic, in_texture, in_polygon, out_image, scale, method, blur_distance, use_pyramids)
@@ -0,0 +1,243 @@
+# ----------------------------------------------------------------------------------------------------
+# Name:        raster_backend.py
+# Purpose:     Raster / vector backends used by the texture masking pipeline
+#              - ArcpyBackend: mosaic datasets, feature classes and geoprocessing tools (requires arcpy)
+#              - PillowBackend: world-file referenced images (.jpg/.jgw, .tif/.tfw, .png/.pgw) and GeoJSON
+#                polygons using PIL/NumPy only, so worker processes start without importing arcpy
+# Authors:     Geoff Taylor | Solution Engineer | Imagery & Remote Sensing
+# Created:     10/19/2026
+# Copyright:   (c) Esri 2026
+# Licence:     Apache Version 2.0
+# -----------------------------------------------------------------------------------------------------
+
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from os import path
+
+# Extent and size in pixels of a single image
+RasterInfo = namedtuple("RasterInfo", ["path", "XMin", "XMax", "YMin", "YMax", "height", "width"])
+
+WORLD_FILE_EXTENSIONS = {".jpg": ".jgw", ".jpeg": ".jgw", ".tif": ".tfw", ".tiff": ".tfw", ".png": ".pgw"}
+IMAGE_EXTENSIONS = tuple(WORLD_FILE_EXTENSIONS)
+
+
+class RasterBackend(ABC):
+    name = None
+
+    def init_worker(self):
+        # Called once in each worker process before its first job
+        pass
+
+    def release_worker(self):
+        # Called when a worker process set up by init_worker exits
+        pass
+
+    @abstractmethod
+    def list_images(self, in_mosaic):
+        pass
+
+    @abstractmethod
+    def describe(self, in_raster):
+        pass
+
+    @abstractmethod
+    def generalize_polygons(self, in_polygon, cell_size, in_raster):
+        # cell_size is in the map units of in_raster (an ortho of the mosaic)
+        pass
+
+    @abstractmethod
+    def partition_polygons(self, in_polygon, i_list):
+        pass
+
+    @abstractmethod
+    def create_mask(self, in_raster, in_polygon, out_mask, clipped_polygons=None):
+        pass
+
+    @abstractmethod
+    def copy_raster(self, in_raster, out_raster):
+        pass
+
+    @abstractmethod
+    def build_pyramids(self, in_raster):
+        pass
+
+    @abstractmethod
+    def delete(self, dataset):
+        pass
+
+
+class ArcpyBackend(RasterBackend):
+    name = "arcpy"
+
+    def init_worker(self):
+        # Extensions are checked out per process, create_mask runs Image Analyst tools in every worker
+        from arcpy import CheckExtension, CheckOutExtension
+        if CheckExtension("ImageAnalyst") != "Available":
+            raise RuntimeError("Image Analyst license is unavailable")
+        CheckOutExtension("ImageAnalyst")
+
+    def release_worker(self):
+        from arcpy import CheckInExtension
+        CheckInExtension("ImageAnalyst")
+
+    def list_images(self, in_mosaic):
+        from arcpy import da
+        from arcpy.management import ExportMosaicDatasetPaths, Delete
+        temp_image_table = path.join("in_memory", "temp_image_table")
+        ExportMosaicDatasetPaths(in_mosaic, temp_image_table, '', "ALL", "RASTER;ITEM_CACHE")
+        images = set([row[0] for row in da.SearchCursor(temp_image_table, "Path")])
+        Delete(temp_image_table)
+        return [i for i in images if ".Overviews" not in i]
+
+    def describe(self, in_raster):
+        from arcpy import Describe
+        if in_raster.lower().endswith('.jpg'):
+            desc = Describe(in_raster + "/Band_1")
+            height, width = desc.height, desc.width
+        else:
+            desc = Describe(in_raster)
+            from arcpy import RasterToNumPyArray
+            arr = RasterToNumPyArray(in_raster + "/Blue", nodata_to_value=0)
+            height, width = arr.shape
+            del arr
+        return RasterInfo(in_raster, desc.extent.XMin, desc.extent.XMax, desc.extent.YMin, desc.extent.YMax, height,
+                          width)
+
+    def generalize_polygons(self, in_polygon, cell_size, in_raster):
+        from generalize_polygons import generalize_feature_class
+        return generalize_feature_class(in_polygon, cell_size, in_raster)
+
+    def partition_polygons(self, in_polygon, i_list):
+        from polygon_partition import partition_feature_class
+        return partition_feature_class(in_polygon, i_list)
+
+    def create_mask(self, in_raster, in_polygon, out_mask, clipped_polygons=None):
+        from create_mask import create_mask
+        create_mask(in_raster, in_polygon, out_mask, clipped_polygons)
+
+    def copy_raster(self, in_raster, out_raster):
+        from arcpy.management import CopyRaster
+        if ".jpg" in out_raster.lower():
+            CopyRaster(in_raster, out_raster, '', None, "256", "NONE", "NONE", "8_BIT_UNSIGNED", "NONE", "NONE",
+                       "JPEG", "NONE", "CURRENT_SLICE", "NO_TRANSPOSE")
+        if ".tif" in out_raster.lower():
+            CopyRaster(in_raster, out_raster, '', None, "256", "NONE", "NONE", "8_BIT_UNSIGNED", "NONE", "NONE",
+                       "TIFF", "NONE", "CURRENT_SLICE", "NO_TRANSPOSE")
+
+    def build_pyramids(self, in_raster):
+        from arcpy.management import BuildPyramids
+        BuildPyramids(in_raster, -1, "NONE", "NEAREST", "DEFAULT", 75, "OVERWRITE")
+
+    def delete(self, dataset):
+        from arcpy.management import Delete
+        Delete(dataset)
+
+
+def world_file(in_raster):
+    base, ext = path.splitext(in_raster)
+    return base + WORLD_FILE_EXTENSIONS.get(ext.lower(), ".wld")
+
+
+def read_world_file(in_raster):
+    # Returns (A, D, B, E, C, F): pixel size x, rotations, pixel size y (negative), center of upper-left pixel
+    with open(world_file(in_raster)) as f:
+        return [float(line) for line in f.read().split()[:6]]
+
+
+def read_polygons(in_polygon):
+    # GeoJSON Polygon / MultiPolygon features as lists of rings, first ring exterior, the rest holes
+    import json
+    with open(in_polygon) as f:
+        data = json.load(f)
+    features = data["features"] if data.get("type") == "FeatureCollection" else [data]
+    polygons = []
+    for feature in features:
+        geometry = feature.get("geometry", feature)
+        if geometry["type"] == "Polygon":
+            polygons.append(geometry["coordinates"])
+        elif geometry["type"] == "MultiPolygon":
+            polygons.extend(geometry["coordinates"])
+    return polygons
+
+
+def rasterize_polygons(polygons, info, size=None):
+    # Mask matching create_mask: 0 inside the polygons (textured), 255 outside (source kept).
+    # polygons are GeoJSON coordinate lists or Esri JSON strings (arcpy partitions), size defaults to the
+    # raster's own. Rings of a polygon are combined even-odd so holes work for both ring conventions.
+    import json
+    from PIL import Image, ImageChops, ImageDraw
+    width, height = size or (info.width, info.height)
+    x_scale = width / (info.XMax - info.XMin)
+    y_scale = height / (info.YMax - info.YMin)
+    inside = Image.new("1", (width, height), 0)
+    for polygon in polygons:
+        rings = json.loads(polygon)["rings"] if isinstance(polygon, str) else polygon
+        feature = Image.new("1", (width, height), 0)
+        for ring in rings:
+            ring_mask = Image.new("1", (width, height), 0)
+            ImageDraw.Draw(ring_mask).polygon([((x - info.XMin) * x_scale - 0.5, (info.YMax - y) * y_scale - 0.5)
+                                               for x, y in (p[:2] for p in ring)], fill=1)
+            feature = ImageChops.logical_xor(feature, ring_mask)
+        inside = ImageChops.logical_or(inside, feature)
+    return ImageChops.invert(inside.convert("L"))
+
+
+class PillowBackend(RasterBackend):
+    name = "pillow"
+
+    def list_images(self, in_mosaic):
+        # A folder of world-file referenced images stands in for the mosaic dataset
+        from os import listdir
+        return [path.join(in_mosaic, f) for f in sorted(listdir(in_mosaic))
+                if f.lower().endswith(IMAGE_EXTENSIONS) and path.exists(world_file(path.join(in_mosaic, f)))]
+
+    def describe(self, in_raster):
+        from PIL import Image
+        with Image.open(in_raster) as img:  # Reads the header only
+            width, height = img.size
+        a, d, b, e, c, f = read_world_file(in_raster)
+        x_min = c - a / 2.0
+        y_max = f - e / 2.0
+        return RasterInfo(in_raster, x_min, x_min + a * width, y_max + e * height, y_max, height, width)
+
+    def generalize_polygons(self, in_polygon, cell_size, in_raster):
+        # GeoJSON polygons share the coordinate system of the world files
+        from generalize_polygons import generalize_geojson
+        return generalize_geojson(in_polygon, cell_size)
+
+    def partition_polygons(self, in_polygon, i_list):
+        from polygon_partition import partition_polygons
+        return partition_polygons(read_polygons(in_polygon), i_list)
+
+    def create_mask(self, in_raster, in_polygon, out_mask, clipped_polygons=None):
+        from shutil import copyfile
+        if clipped_polygons is None:
+            clipped_polygons = read_polygons(in_polygon)
+        mask = rasterize_polygons(clipped_polygons, self.describe(in_raster))
+        mask.convert("RGB").save(out_mask)
+        copyfile(world_file(in_raster), world_file(out_mask))
+
+    def copy_raster(self, in_raster, out_raster):
+        from shutil import copyfile
+        from fill_masked_image import copy_auxillary_files
+        copyfile(in_raster, out_raster)
+        copy_auxillary_files(in_raster, out_raster)
+
+    def build_pyramids(self, in_raster):
+        pass  # Pyramids are built when the tiles are added to a mosaic dataset with the arcpy backend
+
+    def delete(self, dataset):
+        from os import remove
+        for f in [dataset, world_file(dataset), dataset + ".aux.xml"]:
+            if path.exists(f):
+                remove(f)
+
+
+BACKENDS = {ArcpyBackend.name: ArcpyBackend, PillowBackend.name: PillowBackend}
+
+
+def get_backend(backend=None):
+    # Accepts a backend instance or name (names are what get passed to worker processes), defaults to arcpy
+    if isinstance(backend, RasterBackend):
+        return backend
+    return BACKENDS[backend or ArcpyBackend.name]()
@@ -0,0 +1,179 @@
+# ----------------------------------------------------------------------------------------------------
+# Name:        run_monitor.py
+# Purpose:     Live progress and cooperative cancellation of texture masking runs
+#              - Tile level progress with rolling tiles/s, MB/s, ETA and per category tile counts, shown on the
+#                arcpy progressor and periodically rewritten to a metrics file (JSON, Prometheus text for .prom)
+#              - Cancel (geoprocessing Cancel button or a CANCEL file in the output folder) stops new tiles from
+#                starting, in-flight tiles are finished and the run's intermediates are removed
+# Authors:     Geoff Taylor | Solution Engineer | Imagery & Remote Sensing
+# Created:     10/19/2026
+# Copyright:   (c) Esri 2026
+# Licence:     Apache Version 2.0
+# -----------------------------------------------------------------------------------------------------
+
+import sys
+from collections import deque
+from os import path, remove
+from time import time
+
+WINDOW = 60  # Seconds of finished tiles the rolling rates are computed over
+INTERVAL = 5  # Seconds between metrics file rewrites
+CANCEL_FILE = "CANCEL"
+# Left behind by create_mask / texture_image / tile_cache when a run stops early
+INTERMEDIATES = ["*_mask.*", "*_maskTemp*", "*.tmp"]
+# (name, type, help, snapshot key) of the Prometheus text format
+PROMETHEUS_METRICS = [("tiles_total", "gauge", "Tiles in the run", "tiles_total"),
+                      ("tiles_done", "counter", "Tiles written", "tiles_done"),
+                      ("bytes_written", "counter", "Bytes of tiles and pyramids written", "bytes_written"),
+                      ("tiles_per_second", "gauge", "Rolling tile throughput", "tiles_per_second"),
+                      ("mb_per_second", "gauge", "Rolling output throughput", "mb_per_second"),
+                      ("eta_seconds", "gauge", "Estimated seconds to completion", "eta_seconds"),
+                      ("elapsed_seconds", "gauge", "Seconds since the run started", "elapsed_seconds")]
+
+
+class CancelledError(Exception):
+    pass
+
+
+def arcpy_cancelled():
+    # Only consulted when arcpy is already loaded, i.e. inside a geoprocessing tool
+    arcpy = sys.modules.get("arcpy")
+    return bool(getattr(arcpy.env, "isCancelled", False)) if arcpy else False
+
+
+class CancelToken:
+
+    def __init__(self, cancel_file=None):
+        self.cancel_file = cancel_file
+        self.cancelled = False
+        if cancel_file and path.exists(cancel_file):
+            remove(cancel_file)  # Left over from an earlier run
+
+    def cancel(self):
+        self.cancelled = True
+
+    def is_set(self):
+        if not self.cancelled:
+            self.cancelled = bool(self.cancel_file and path.exists(self.cancel_file)) or arcpy_cancelled()
+        return self.cancelled
+
+
+def clean_intermediates(folder):
+    from glob import glob
+    removed = 0
+    for pattern in INTERMEDIATES:
+        for f in glob(path.join(folder, pattern)):
+            try:
+                remove(f)
+                removed += 1
+            except OSError:
+                pass  # Still locked, e.g. by a worker on another host
+    return removed
+
+
+class ThroughputMonitor:
+    # Use as a context manager around the run and pass tile_done as (or call it from) run_texture_jobs' on_done
+
+    def __init__(self, total, metrics_file=None, progressor=False, window=WINDOW, interval=INTERVAL):
+        from threading import Thread, Event, Lock
+        self.total = total
+        self.metrics_file = metrics_file
+        self.progressor = progressor
+        self.window = window
+        self.interval = interval
+        self.started = time()
+        self.done = 0
+        self.bytes = 0
+        self.categories = {}
+        self.recent = deque()  # (finish time, bytes) of the tiles within the window
+        self.status = "running"
+        self.lock = Lock()
+        self.stopped = Event()
+        self.thread = Thread(target=self.write_loop, daemon=True)
+
+    def tile_done(self, index, timings):
+        now = time()
+        with self.lock:
+            self.done += 1
+            tile_bytes = (timings or {}).get("bytes", 0)
+            self.bytes += tile_bytes
+            if timings and "category" in timings:
+                self.categories[timings["category"]] = self.categories.get(timings["category"], 0) + 1
+            self.recent.append((now, tile_bytes))
+        if self.progressor:
+            from arcpy import SetProgressorPosition, SetProgressorLabel
+            SetProgressorPosition(self.done)
+            SetProgressorLabel(self.label())
+
+    def snapshot(self):
+        now = time()
+        with self.lock:
+            while self.recent and now - self.recent[0][0] > self.window:
+                self.recent.popleft()
+            span = max(min(self.window, now - self.started), 1e-6)
+            tiles_per_second = len(self.recent) / span
+            mb_per_second = sum(b for _, b in self.recent) / span / (1024 * 1024)
+            remaining = self.total - self.done
+            return {"status": self.status, "tiles_total": self.total, "tiles_done": self.done,
+                    "tiles": dict(self.categories), "bytes_written": self.bytes,
+                    "tiles_per_second": tiles_per_second, "mb_per_second": mb_per_second,
+                    "eta_seconds": remaining / tiles_per_second if tiles_per_second else None,
+                    "elapsed_seconds": now - self.started, "updated": now}
+
+    def label(self):
+        from datetime import timedelta
+        s = self.snapshot()
+        eta = "--" if s["eta_seconds"] is None else str(timedelta(seconds=int(s["eta_seconds"])))
+        counts = ", ".join("{0} {1}".format(n, category) for category, n in sorted(s["tiles"].items()))
+        return "{0}/{1} tiles | {2:.2f} tiles/s | {3:.1f} MB/s | ETA {4} | {5}".format(
+            s["tiles_done"], s["tiles_total"], s["tiles_per_second"], s["mb_per_second"], eta, counts)
+
+    def prometheus(self, s):
+        lines = []
+        for name, metric_type, help_text, key in PROMETHEUS_METRICS:
+            if s[key] is None:
+                continue
+            lines += ["# HELP texture_masking_{0} {1}".format(name, help_text),
+                      "# TYPE texture_masking_{0} {1}".format(name, metric_type),
+                      "texture_masking_{0} {1}".format(name, s[key])]
+        lines += ["# HELP texture_masking_category_tiles Tiles written per mask category",
+                  "# TYPE texture_masking_category_tiles counter"]
+        lines += ['texture_masking_category_tiles{{category="{0}"}} {1}'.format(category, n)
+                  for category, n in sorted(s["tiles"].items())]
+        lines += ["# HELP texture_masking_running 1 while tiles are being written",
+                  "# TYPE texture_masking_running gauge",
+                  "texture_masking_running {0}".format(int(s["status"] == "running"))]
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        if not self.metrics_file:
+            return
+        import json
+        from os import replace, getpid
+        s = self.snapshot()
+        temp = "{0}.{1}.tmp".format(self.metrics_file, getpid())
+        with open(temp, "w") as f:
+            if self.metrics_file.lower().endswith(".prom"):
+                f.write(self.prometheus(s))
+            else:
+                json.dump(s, f, indent=2)
+        replace(temp, self.metrics_file)  # Scrapers never see a partial file
+
+    def write_loop(self):
+        # Rewritten on a timer, not per tile, so rates and ETA stay current while long tiles are in flight
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def __enter__(self):
+        if self.progressor:
+            from arcpy import SetProgressor
+            SetProgressor("step", "Texturing {0} tiles...".format(self.total), 0, self.total, 1)
+        self.write()
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self.status = "cancelled" if exc_type is CancelledError else "failed" if exc_type else "finished"
+        self.write()
@@ -0,0 +1,193 @@
+# ----------------------------------------------------------------------------------------------------
+# Name:        run_planner.py
+# Purpose:     Dry-run planner and cost estimator for Mosaic_Texture_Masking
+#              - Builds the tile catalog and the polygon / tile intersections without writing any output and
+#                sorts the tiles into untouched (no polygon), partial and fully masked
+#              - Projects output bytes and wall time from per-stage throughput calibrated by earlier runs
+#                (texture_image timings recorded in the user's temp folder)
+# Authors:     Geoff Taylor | Solution Engineer | Imagery & Remote Sensing
+# Created:     10/19/2026
+# Copyright:   (c) Esri 2026
+# Licence:     Apache Version 2.0
+# -----------------------------------------------------------------------------------------------------
+
+from os import path
+
+UNTOUCHED = "untouched"  # Mask all 255, the source tile is copied
+PARTIAL = "partial"
+FULL = "full"  # Mask all 0, the tile is texture only
+CATEGORIES = [UNTOUCHED, PARTIAL, FULL]
+STAGES = ["mask", "blend", "pyramids", "cache_hit"]
+SMOOTHING = 0.3  # Weight of the latest run in the calibration
+# Seconds per megapixel of each stage and output bytes per pixel, used until a run has been recorded
+DEFAULT_CALIBRATION = {UNTOUCHED: {"mask": 0.5, "blend": 0.2, "pyramids": 0.3, "cache_hit": 0.0,
+                                   "bytes_per_pixel": 0.5},
+                       PARTIAL: {"mask": 0.5, "blend": 1.5, "pyramids": 0.3, "cache_hit": 0.0,
+                                 "bytes_per_pixel": 0.5},
+                       FULL: {"mask": 0.5, "blend": 1.2, "pyramids": 0.3, "cache_hit": 0.1,
+                              "bytes_per_pixel": 0.4}}
+
+
+def calibration_file():
+    from tempfile import gettempdir
+    return path.join(gettempdir(), "ArcGIS_Image_Designer", "calibration.json")
+
+
+def mask_category(in_mask):
+    from PIL import Image
+    with Image.open(in_mask) as mask:
+        low, high = mask.convert('L').getextrema()
+    if low != 0:
+        return UNTOUCHED
+    return FULL if high == 0 else PARTIAL
+
+
+def output_bytes(out_raster):
+    return sum(path.getsize(f) for f in [out_raster, out_raster + ".ovr"] if path.exists(f))
+
+
+def load_calibration():
+    # Returns ({category: {stage: seconds per megapixel, "bytes_per_pixel": ...}}, calibrated)
+    import json
+    from copy import deepcopy
+    calibration = deepcopy(DEFAULT_CALIBRATION)
+    try:
+        with open(calibration_file()) as f:
+            recorded = json.load(f)
+    except (OSError, ValueError):
+        return calibration, False
+    for category, values in recorded.items():
+        calibration.setdefault(category, {}).update(values)
+    return calibration, True
+
+
+def record_calibration(results):
+    # results: texture_image timings ({"category", "pixels", "bytes", stage: seconds}) of a finished run
+    import json
+    from os import makedirs, replace, getpid
+    if not results:
+        return
+    calibration, calibrated = load_calibration()
+    for category in CATEGORIES:
+        tiles = [r for r in results if r.get("category") == category and r.get("pixels")]
+        if not tiles:
+            continue
+        megapixels = sum(r["pixels"] for r in tiles) / 1e6
+        measured = {"bytes_per_pixel": sum(r.get("bytes", 0) for r in tiles) / (megapixels * 1e6)}
+        for stage in STAGES:
+            timed = [r for r in tiles if stage in r]
+            if timed:
+                measured[stage] = sum(r[stage] for r in timed) / (sum(r["pixels"] for r in timed) / 1e6)
+        values = calibration[category]
+        recorded = values.get("tiles", 0)
+        for key, value in measured.items():
+            # The first recorded run replaces the defaults
+            values[key] = value if not recorded else SMOOTHING * value + (1 - SMOOTHING) * values[key]
+        values["tiles"] = recorded + len(tiles)
+    out_file = calibration_file()
+    makedirs(path.dirname(out_file), exist_ok=True)
+    temp = "{0}.{1}.tmp".format(out_file, getpid())
+    with open(temp, "w") as f:
+        json.dump(calibration, f, indent=2)
+    replace(temp, out_file)
+
+
+def polygon_area(polygon):
+    # Clipped polygon as Esri JSON (arcpy backend) or GeoJSON coordinate lists (pillow backend). Holes wind
+    # opposite to the exterior ring in both conventions, so the absolute signed sum is the net area.
+    import json
+    rings = json.loads(polygon)["rings"] if isinstance(polygon, str) else polygon
+    area = 0.0
+    for ring in rings:
+        points = [p[:2] for p in ring]
+        area += sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1]))
+    return abs(area) / 2.0
+
+
+def tile_category(i, clipped_polygons, tolerance=1e-6):
+    if not clipped_polygons:
+        return UNTOUCHED
+    tile_area = (i[2] - i[1]) * (i[4] - i[3])
+    # Overlapping polygons are counted twice, rare in dune / vegetation outlines and only shifts partial to full
+    covered = sum(polygon_area(p) for p in clipped_polygons)
+    return FULL if covered >= tile_area * (1 - tolerance) else PARTIAL
+
+
+def concurrency(i_list, blur_distance, memory_budget, max_workers, queue_dir):
+    # Tiles expected to run at once in the mode run_texture_jobs will use
+    from os import cpu_count
+    from memory_scheduler import estimate_catalog, MB, PROCESS_OVERHEAD
+    if queue_dir:
+        return max_workers or 1  # Local queue workers started by run_jobs, workers on other hosts are not known
+    workers = max_workers or cpu_count() or 1
+    if not memory_budget:
+        return 1
+    estimates = estimate_catalog(i_list, blur_distance, shared_texture=True)
+    per_job = sum(estimates) / float(len(estimates)) + PROCESS_OVERHEAD
+    return max(1, min(workers, int(memory_budget * MB // per_job)))
+
+
+def plan_mosaic(in_mosaic, in_polygon, blur_distance, memory_budget=None, max_workers=None, queue_dir=None,
+                dedup=True, backend=None, generalize=True):
+    # Returns the projected run of one mosaic, no tiles are written (generalized polygons are cached as in a run)
+    from raster_backend import get_backend
+    from Mosaic_Texture_Masking import get_images_and_stats, texture_clip_extent
+    backend = get_backend(backend)
+    i_list, extent = get_images_and_stats(in_mosaic, backend)
+    if generalize:  # Same polygons as prepare_texture_jobs
+        from generalize_polygons import cell_size_of
+        in_polygon = backend.generalize_polygons(in_polygon, cell_size_of(i_list), i_list[0][0])
+    partitions = backend.partition_polygons(in_polygon, i_list)
+    calibration, calibrated = load_calibration()
+    max_height = max(i_list, key=lambda x: x[5])[5]
+    max_width = max(i_list, key=lambda x: x[6])[6]
+
+    plan = {"mosaic": in_mosaic, "calibrated": calibrated, "intersections": 0, "bytes": 0, "cpu_seconds": 0.0,
+            "tiles": {category: 0 for category in CATEGORIES}, "cache_hits": 0}
+    unique_full = set()
+    for i in i_list:
+        clipped_polygons = partitions[i[0]]
+        category = tile_category(i, clipped_polygons)
+        values = calibration[category]
+        megapixels = i[5] * i[6] / 1e6
+        plan["intersections"] += len(clipped_polygons)
+        plan["tiles"][category] += 1
+        plan["cpu_seconds"] += values["mask"] * megapixels
+        # Fully masked tiles with the same crop and size are identical, only the first is blended when deduplicating
+        if category == FULL and dedup:
+            key = (texture_clip_extent(i[7], i[5], i[6], max_height, max_width), i[5], i[6])
+            if key in unique_full:
+                plan["cache_hits"] += 1
+                plan["cpu_seconds"] += values["cache_hit"] * megapixels
+                continue
+            unique_full.add(key)
+        plan["cpu_seconds"] += (values["blend"] + values["pyramids"]) * megapixels
+        if category == UNTOUCHED:  # Copied from the source tile
+            plan["bytes"] += path.getsize(i[0]) if path.exists(i[0]) else values["bytes_per_pixel"] * i[5] * i[6]
+        else:
+            plan["bytes"] += values["bytes_per_pixel"] * i[5] * i[6]
+    plan["workers"] = concurrency(i_list, blur_distance, memory_budget, max_workers, queue_dir)
+    plan["wall_seconds"] = plan["cpu_seconds"] / plan["workers"]
+    return plan
+
+
+def format_plan(plan):
+    from datetime import timedelta
+    from memory_scheduler import MB
+    tiles = plan["tiles"]
+    lines = ["{0}: {1} tiles ({2} untouched, {3} partial, {4} fully masked), {5} polygon / tile intersections".format(
+                 plan["mosaic"], sum(tiles.values()), tiles[UNTOUCHED], tiles[PARTIAL], tiles[FULL],
+                 plan["intersections"]),
+             "  projected output {0:.1f} MB, {1} identical fully masked tiles reused".format(
+                 plan["bytes"] / float(MB), plan["cache_hits"]),
+             "  estimated wall time {0} on {1} workers{2}".format(
+                 timedelta(seconds=int(round(plan["wall_seconds"]))), plan["workers"],
+                 "" if plan["calibrated"] else " (uncalibrated defaults, run once to calibrate)")]
+    return lines
+
+
+def report_plan(plan):
+    from arcpy import AddMessage
+    for line in format_plan(plan):
+        AddMessage(line)
+        print(line)
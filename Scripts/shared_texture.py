@@ -0,0 +1,60 @@
+# ----------------------------------------------------------------------------------------------------
+# Name:        shared_texture.py
+# Purpose:     Zero-copy texture store shared by tile worker processes
+#              - The parent decodes and resizes the texture to max_width x max_height once per mosaic and writes
+#                it to a raw memory mapped file
+#              - Workers map the file read-only (once per process) and take crops as NumPy views, the OS page
+#                cache holds a single copy of the texture for all workers
+# Authors:     Geoff Taylor | Solution Engineer | Imagery & Remote Sensing
+# Created:     10/19/2026
+# Copyright:   (c) Esri 2026
+# Licence:     Apache Version 2.0
+# -----------------------------------------------------------------------------------------------------
+
+from os import path
+
+_attached = {}
+
+
+def create_shared_texture(in_texture, max_width, max_height, folder):
+    # Returns the descriptor (filename, height, width) that is passed to the workers
+    from PIL import Image
+    from numpy import memmap, asarray, uint8
+    filename = path.join(folder, "{0}_{1}x{2}.rgb".format(path.splitext(path.basename(in_texture))[0], max_width,
+                                                          max_height))
+    texture = Image.open(in_texture).convert("RGB").resize((max_width, max_height), Image.LANCZOS)
+    store = memmap(filename, dtype=uint8, mode="w+", shape=(max_height, max_width, 3))
+    store[:] = asarray(texture)
+    store.flush()
+    del store
+    return filename, max_height, max_width
+
+
+def attach(descriptor):
+    # Maps the texture once per process. Only the latest texture stays mapped, so a long lived worker does not
+    # hold on to the textures of earlier runs.
+    filename, height, width = descriptor
+    if filename not in _attached:
+        detach()
+        from numpy import memmap, uint8
+        _attached[filename] = memmap(filename, dtype=uint8, mode="r", shape=(height, width, 3))
+    return _attached[filename]
+
+
+def detach():
+    # Drops this process' mapping. On Windows a mapped file cannot be deleted, so long lived workers call this
+    # after each job to let the run remove its work folder.
+    _attached.clear()
+
+
+def crop(descriptor, box):
+    # box follows PIL Image.crop: (left, upper, right, lower). In-bounds boxes are returned as views of the
+    # shared texture, anything else falls back to PIL so results match Image.crop exactly.
+    texture = attach(descriptor)
+    left, upper, right, lower = box
+    height, width = texture.shape[:2]
+    if 0 <= left <= right <= width and 0 <= upper <= lower <= height:
+        return texture[upper:lower, left:right]
+    from PIL import Image
+    from numpy import asarray
+    return asarray(Image.fromarray(texture).crop(box))
@@ -0,0 +1,106 @@
+# Headless checks of the block windowing and blending of block_texture_masking
+#   python -m unittest discover -s Scripts/tests
+
+import sys
+import unittest
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from block_texture_masking import iter_blocks, blur_halo, tile_texture, map_origin, blend_block  # noqa: E402
+
+try:
+    import numpy
+    from PIL import Image  # noqa: F401
+except ImportError:
+    numpy = None
+
+
+class IterBlocksTest(unittest.TestCase):
+
+    def test_blocks_cover_the_raster_once(self):
+        covered = {}
+        for row, col, nrows, ncols, _ in iter_blocks(70, 45, 32):
+            for r in range(row, row + nrows):
+                for c in range(col, col + ncols):
+                    covered[r, c] = covered.get((r, c), 0) + 1
+        self.assertEqual(len(covered), 70 * 45)
+        self.assertEqual(set(covered.values()), {1})
+
+    def test_halo_window_is_clamped_to_the_raster(self):
+        windows = {(row, col): window for row, col, _, _, window in iter_blocks(70, 45, 32, halo=5)}
+        self.assertEqual(windows[0, 0], (0, 0, 37, 37))
+        self.assertEqual(windows[32, 32], (27, 27, 42, 18))
+        self.assertEqual(windows[64, 0], (59, 0, 11, 37))
+
+    def test_no_halo_without_blur(self):
+        self.assertEqual(blur_halo("None", 4), 0)
+        self.assertEqual(blur_halo("GaussianBlur", 0), 0)
+        self.assertEqual(blur_halo("GaussianBlur", 2.5), 8)
+
+
+class MapOriginTest(unittest.TestCase):
+
+    def test_adjacent_orthos_continue_the_cell_grid(self):
+        # 0.6 m cells, the second ortho starts 1000 cells east and 500 cells south of the first
+        first = map_origin(431000.0, 3255000.0, 0.6, 0.6)
+        second = map_origin(431600.0, 3254700.0, 0.6, 0.6)
+        self.assertEqual((second[0] - first[0], second[1] - first[1]), (500, 1000))
+
+    def test_float_error_rounds_to_the_nearest_cell(self):
+        self.assertEqual(map_origin(0.1 + 0.2, 0.7 - 0.1, 0.1, 0.1), (-6, 3))
+
+
+@unittest.skipIf(numpy is None, "numpy and Pillow are required")
+class TileTextureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.texture = numpy.arange(5 * 7 * 3, dtype=numpy.uint8).reshape(5, 7, 3)
+
+    def test_texture_repeats(self):
+        window = tile_texture(self.texture, 0, 0, 12, 16)
+        self.assertEqual(window.shape, (12, 16, 3))
+        self.assertTrue((window[5:10, 7:14] == self.texture).all())
+
+    def test_windows_of_one_grid_agree(self):
+        whole = tile_texture(self.texture, 0, 0, 20, 20, row_origin=-3, col_origin=11)
+        block = tile_texture(self.texture, 8, 6, 9, 10, row_origin=-3, col_origin=11)
+        self.assertTrue((whole[8:17, 6:16] == block).all())
+
+
+@unittest.skipIf(numpy is None, "numpy and Pillow are required")
+class BlendBlockTest(unittest.TestCase):
+
+    def setUp(self):
+        size = 40
+        self.rgb = numpy.full((size, size, 3), 200, dtype=numpy.uint8)
+        self.texture = tile_texture(numpy.arange(4 * 4 * 3, dtype=numpy.uint8).reshape(4, 4, 3) * 5, 0, 0, size,
+                                    size)
+        self.keep = numpy.full((size, size), 255, dtype=numpy.uint8)
+        self.keep[10:30, 5:25] = 0
+
+    def test_untouched_block_is_returned_as_is(self):
+        keep = numpy.full((8, 8), 255, dtype=numpy.uint8)
+        rgb = self.rgb[:8, :8]
+        self.assertIs(blend_block(rgb, keep, self.texture[:8, :8], "GaussianBlur", 2, (0, 0, 8, 8)), rgb)
+
+    def test_masked_pixels_are_texture(self):
+        out = blend_block(self.rgb, self.keep, self.texture, "None", 0, (0, 0, 40, 40))
+        self.assertTrue((out[10:30, 5:25] == self.texture[10:30, 5:25]).all())
+        self.assertTrue((out[:10] == 200).all())
+
+    def test_blocks_with_halo_match_the_whole_image(self):
+        whole = blend_block(self.rgb, self.keep, self.texture, "GaussianBlur", 2, (0, 0, 40, 40))
+        out = numpy.zeros_like(whole)
+        for row, col, nrows, ncols, (h_row, h_col, h_nrows, h_ncols) in iter_blocks(40, 40, 16,
+                                                                                 blur_halo("GaussianBlur", 2)):
+            keep = self.keep[h_row:h_row + h_nrows, h_col:h_col + h_ncols]
+            crop = (row - h_row, col - h_col, nrows, ncols)
+            out[row:row + nrows, col:col + ncols] = blend_block(
+                self.rgb[row:row + nrows, col:col + ncols], keep, self.texture[row:row + nrows, col:col + ncols],
+                "GaussianBlur", 2, crop)
+        self.assertTrue((out == whole).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+# Headless checks of the resolution aware polygon generalization
+#   python -m unittest discover -s Scripts/tests
+
+import json
+import sys
+import unittest
+from math import cos, sin, pi
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from generalize_polygons import cell_size_of, simplify_ring, point_line_distance, generalize_geojson  # noqa: E402
+
+
+def circle(radius, vertices):
+    ring = [[radius * cos(2 * pi * n / vertices), radius * sin(2 * pi * n / vertices)] for n in range(vertices)]
+    return ring + [ring[0]]
+
+
+class SimplifyRingTest(unittest.TestCase):
+
+    def test_collinear_vertices_are_removed(self):
+        ring = [[0, 0], [5, 0], [10, 0], [10, 10], [5, 10], [0, 10], [0, 0]]
+        self.assertEqual(simplify_ring(ring, 0.1), [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]])
+
+    def test_removed_vertices_stay_within_tolerance(self):
+        ring = circle(100, 2000)
+        simplified = simplify_ring(ring, 0.25)
+        self.assertLess(len(simplified), len(ring) // 10)
+        self.assertEqual(simplified[0], simplified[-1])
+        for p in ring:
+            distance = min(point_line_distance(p, a, b) for a, b in zip(simplified, simplified[1:]))
+            self.assertLessEqual(distance, 0.25 + 1e-9)
+
+    def test_triangles_are_kept(self):
+        ring = [[0, 0], [1, 0], [0, 1], [0, 0]]
+        self.assertEqual(simplify_ring(ring, 10), ring)
+
+
+class GeneralizeGeojsonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.in_polygon = path.join(self.folder, "polygon.geojson")
+        with open(self.in_polygon, "w") as f:
+            json.dump({"type": "Polygon", "coordinates": [circle(100, 2000)]}, f)
+
+    def tearDown(self):
+        rmtree(self.folder)
+
+    def test_cell_size_is_the_finest_of_the_catalog(self):
+        self.assertEqual(cell_size_of([["a", 0, 100, 0, 50, 100, 200], ["b", 0, 60, 0, 60, 100, 100]]), 0.5)
+
+    def test_generalized_polygons_are_cached_per_cell_size(self):
+        cache = path.join(self.folder, "cache")
+        out_polygon = generalize_geojson(self.in_polygon, 1.0, cache_folder=cache)
+        self.assertEqual(generalize_geojson(self.in_polygon, 1.0, cache_folder=cache), out_polygon)
+        self.assertNotEqual(generalize_geojson(self.in_polygon, 2.0, cache_folder=cache), out_polygon)
+        with open(out_polygon) as f:
+            polygons = json.load(f)["coordinates"]
+        self.assertLess(len(polygons[0][0]), 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
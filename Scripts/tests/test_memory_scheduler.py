@@ -0,0 +1,93 @@
+# Headless checks of the memory budget scheduler
+#   python -m unittest discover -s Scripts/tests
+
+import sys
+import unittest
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from memory_scheduler import MemoryScheduler, MB  # noqa: E402
+from raster_backend import BACKENDS, PillowBackend  # noqa: E402
+
+initialized = []
+
+
+class RecordingBackend(PillowBackend):
+    name = "recording_pool"
+
+    def init_worker(self):
+        initialized.append(self.name)
+
+
+BACKENDS[RecordingBackend.name] = RecordingBackend
+
+
+def worker_initialized():
+    return list(initialized)
+
+
+def pending_of(estimates):
+    return [(estimate * MB, (index, ())) for index, estimate in enumerate(estimates)]
+
+
+class AdmitTest(unittest.TestCase):
+
+    def test_jobs_are_admitted_while_they_fit(self):
+        scheduler = MemoryScheduler(700 * MB, max_workers=8, process_overhead=100 * MB)
+        pending = pending_of([100, 100, 100, 100])
+        admitted = scheduler.admit(pending)
+        self.assertEqual([index for _, (index, _) in admitted], [0, 1, 2])
+        self.assertEqual(len(pending), 1)
+        self.assertEqual(scheduler.in_use, 600 * MB)
+
+    def test_smaller_jobs_backfill_behind_a_large_one(self):
+        scheduler = MemoryScheduler(1000 * MB, max_workers=8, process_overhead=100 * MB)
+        pending = pending_of([300, 600, 100])
+        admitted = scheduler.admit(pending)
+        self.assertEqual([index for _, (index, _) in admitted], [0, 2])
+        self.assertEqual([index for _, (index, _) in pending], [1])
+
+    def test_oversized_job_runs_alone(self):
+        scheduler = MemoryScheduler(1000 * MB, max_workers=8, process_overhead=100 * MB)
+        pending = pending_of([5000, 10])
+        self.assertEqual([index for _, (index, _) in scheduler.admit(pending)], [0])
+        self.assertEqual([index for _, (index, _) in pending], [1])
+        scheduler.release(5000 * MB)
+        self.assertEqual(scheduler.in_use, 0)
+
+    def test_max_workers_caps_admission(self):
+        scheduler = MemoryScheduler(1000 * MB, max_workers=2, process_overhead=0)
+        self.assertEqual(len(scheduler.admit(pending_of([1, 1, 1, 1]))), 2)
+
+    def test_pool_is_sized_to_the_budget(self):
+        scheduler = MemoryScheduler(4000 * MB, max_workers=32, process_overhead=450 * MB)
+        self.assertEqual(scheduler.pool_size([50 * MB, 900 * MB]), 8)
+        self.assertEqual(MemoryScheduler(10 * MB, max_workers=4).pool_size([MB]), 1)
+        self.assertEqual(scheduler.pool_size([]), 1)
+
+
+class RunTest(unittest.TestCase):
+
+    def test_results_and_errors_are_reported_per_job(self):
+        scheduler = MemoryScheduler(4000 * MB, max_workers=2, process_overhead=100 * MB)
+        done, failed = {}, {}
+        jobs = [(MB, (2, 3)), (MB, (0, -1)), (MB, (3, 2))]  # pow(0, -1) raises ZeroDivisionError
+        results = scheduler.run(pow, jobs, on_done=done.__setitem__, on_error=failed.__setitem__)
+        self.assertEqual(results, [8, None, 9])
+        self.assertEqual(done, {0: 8, 2: 9})
+        self.assertIn("ZeroDivisionError", failed[1])
+
+    def test_workers_are_set_up_for_the_backend(self):
+        scheduler = MemoryScheduler(4000 * MB, max_workers=2, process_overhead=100 * MB)
+        results = scheduler.run(worker_initialized, [(MB, ())] * 3, backend=RecordingBackend.name)
+        self.assertEqual(results, [["recording_pool"]] * 3)
+        self.assertEqual(initialized, [])  # Only in the workers
+
+    def test_cancelled_run_admits_no_jobs(self):
+        scheduler = MemoryScheduler(4000 * MB, max_workers=2, process_overhead=100 * MB)
+        self.assertEqual(scheduler.run(pow, [(MB, (2, 3))] * 3, cancelled=lambda: True), [None] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
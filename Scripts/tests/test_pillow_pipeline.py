@@ -0,0 +1,88 @@
+# Headless end to end checks of texture masking on a synthetic world-file mosaic with the pillow backend
+#   python -m unittest discover -s Scripts/tests
+
+import json
+import sys
+import tempfile
+import unittest
+from hashlib import sha1
+from os import path, makedirs, listdir
+from shutil import rmtree
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+try:
+    import numpy  # noqa: F401
+    from PIL import Image
+except ImportError:
+    Image = None
+
+GRID = 5
+TILE_SIZE = 64
+
+
+def make_mosaic(root):
+    # GRID x GRID tiles of TILE_SIZE map units at one unit per pixel, the polygon fully covers four tiles
+    # and partly covers the twelve around them, the top row and right column are untouched
+    tiles = path.join(root, "tiles")
+    makedirs(tiles)
+    for row in range(GRID):
+        for col in range(GRID):
+            in_tile = path.join(tiles, "tile{0}{1}.jpg".format(row, col))
+            Image.new("RGB", (TILE_SIZE, TILE_SIZE), (40 + 50 * row, 40 + 50 * col, 100)).save(in_tile)
+            with open(path.splitext(in_tile)[0] + ".jgw", "w") as f:
+                f.write("1.0\n0\n0\n-1.0\n{0}\n{1}\n".format(col * TILE_SIZE + 0.5, (GRID - row) * TILE_SIZE - 0.5))
+    texture = Image.new("RGB", (48, 48))
+    texture.putdata([(x * 5, 255 - y * 5, (x * y) % 256) for y in range(48) for x in range(48)])
+    texture.save(path.join(root, "texture.jpg"))
+    low, high = TILE_SIZE - 20, 3 * TILE_SIZE + 20
+    with open(path.join(root, "polygon.geojson"), "w") as f:
+        json.dump({"type": "FeatureCollection", "features": [{"type": "Feature", "geometry": {
+            "type": "Polygon", "coordinates": [[[low, low], [high, low], [high, high], [low, high], [low, low]]]}}]},
+            f)
+    return tiles, path.join(root, "texture.jpg"), path.join(root, "polygon.geojson")
+
+
+def tile_digests(out_folder):
+    digests = {}
+    for name in sorted(listdir(out_folder)):
+        if name.endswith(".jpg"):
+            with open(path.join(out_folder, name), "rb") as f:
+                digests[name] = sha1(f.read()).hexdigest()
+    return digests
+
+
+@unittest.skipIf(Image is None, "Pillow and numpy are required")
+class PillowPipelineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        from Mosaic_Texture_Masking import get_images_and_stats
+        cls.root = tempfile.mkdtemp()
+        # Calibration and generalized polygon caches go to the temp folder, keep them out of the user's
+        cls.tempdir, tempfile.tempdir = tempfile.tempdir, cls.root
+        cls.tiles, cls.texture, cls.polygon = make_mosaic(cls.root)
+        cls.i_list, cls.extent = get_images_and_stats(cls.tiles, "pillow")
+
+    @classmethod
+    def tearDownClass(cls):
+        tempfile.tempdir = cls.tempdir
+        rmtree(cls.root)
+
+    def run_mode(self, name, **kwargs):
+        from Mosaic_Texture_Masking import texture_images
+        out_folder = path.join(self.root, name)
+        makedirs(out_folder)
+        texture_images(self.i_list, self.extent, self.texture, self.polygon, out_folder, "GaussianBlur", 2,
+                       backend="pillow", **kwargs)
+        return tile_digests(out_folder)
+
+    def test_run_modes_write_identical_tiles(self):
+        sequential = self.run_mode("sequential")
+        self.assertEqual(len(sequential), GRID * GRID)
+        self.assertEqual(self.run_mode("scheduler", memory_budget=4000, max_workers=2), sequential)
+        self.assertEqual(self.run_mode("queue", queue_dir=path.join(self.root, "queue"), max_workers=2), sequential)
+
+
+if __name__ == "__main__":
+    unittest.main()
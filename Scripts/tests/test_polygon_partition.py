@@ -0,0 +1,60 @@
+# Headless checks of the pure Python polygon / tile partitioning
+#   python -m unittest discover -s Scripts/tests
+
+import sys
+import unittest
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from polygon_partition import TileIndex, clip_ring, clip_polygon, partition_polygons  # noqa: E402
+
+
+def square(x_min, y_min, size):
+    return [[x_min, y_min], [x_min + size, y_min], [x_min + size, y_min + size], [x_min, y_min + size],
+            [x_min, y_min]]
+
+
+def area(rings):
+    return abs(sum(x0 * y1 - x1 * y0 for ring in rings for (x0, y0), (x1, y1) in zip(ring, ring[1:]))) / 2.0
+
+
+class ClipRingTest(unittest.TestCase):
+
+    def test_inside_ring_is_unchanged(self):
+        self.assertEqual(clip_ring(square(1, 1, 2), 0, 10, 0, 10), square(1, 1, 2))
+
+    def test_outside_ring_is_dropped(self):
+        self.assertIsNone(clip_ring(square(20, 20, 2), 0, 10, 0, 10))
+
+    def test_overlapping_ring_is_cut_to_the_rectangle(self):
+        clipped = clip_ring(square(-5, -5, 10), 0, 10, 0, 10)
+        self.assertEqual(clipped[0], clipped[-1])
+        self.assertAlmostEqual(area([clipped]), 25.0)
+        for x, y in clipped:
+            self.assertTrue(0 <= x <= 10 and 0 <= y <= 10)
+
+    def test_hole_outside_the_tile_is_dropped(self):
+        rings = [square(0, 0, 20), square(15, 15, 2)]
+        self.assertEqual(len(clip_polygon(rings, 0, 10, 0, 10)), 1)
+
+
+class PartitionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.i_list = [["a", 0, 10, 0, 10, 10, 10], ["b", 10, 20, 0, 10, 10, 10], ["c", 20, 30, 0, 10, 10, 10]]
+
+    def test_index_finds_overlapping_tiles(self):
+        index = TileIndex(self.i_list)
+        self.assertEqual(sorted(i[0] for i in index.overlapping(5, 15, 2, 8)), ["a", "b"])
+        self.assertEqual(list(index.overlapping(40, 50, 2, 8)), [])
+
+    def test_polygons_are_clipped_to_each_overlapping_tile(self):
+        partitions = partition_polygons([[square(5, 2, 10)]], self.i_list)
+        self.assertEqual([len(partitions[name]) for name in "abc"], [1, 1, 0])
+        self.assertAlmostEqual(area(partitions["a"][0]), 40.0)
+        self.assertAlmostEqual(area(partitions["b"][0]), 40.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
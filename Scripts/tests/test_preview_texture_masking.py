@@ -0,0 +1,66 @@
+# Headless checks of the low resolution preview with the pillow backend
+#   python -m unittest discover -s Scripts/tests
+
+import sys
+import tempfile
+import unittest
+from os import path
+from shutil import rmtree
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+try:
+    import numpy
+    from PIL import Image
+except ImportError:
+    Image = None
+
+if Image is not None:
+    from test_pillow_pipeline import make_mosaic, GRID, TILE_SIZE
+
+
+@unittest.skipIf(Image is None, "Pillow and numpy are required")
+class PreviewTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        # Generalized polygon caches go to the temp folder, keep them out of the user's
+        self.tempdir, tempfile.tempdir = tempfile.tempdir, self.root
+        self.tiles, self.texture, self.polygon = make_mosaic(self.root)
+
+    def tearDown(self):
+        tempfile.tempdir = self.tempdir
+        rmtree(self.root)
+
+    def preview(self, scale):
+        from preview_texture_masking import preview_texture_masking
+        out_image = path.join(self.root, "preview_{0}.png".format(scale))
+        preview_texture_masking(self.tiles, self.texture, self.polygon, out_image, scale, "GaussianBlur", 4,
+                                backend="pillow")
+        return out_image
+
+    def test_tiles_cover_the_canvas_without_seams(self):
+        # The synthetic tiles and texture have no black pixels, the canvas background is black
+        for scale in [2, 3, 5]:
+            with Image.open(self.preview(scale)) as preview:
+                pixels = numpy.asarray(preview.convert("RGB"))
+            self.assertEqual(pixels.shape[:2], (int(round(GRID * TILE_SIZE / float(scale))),) * 2)
+            self.assertFalse((pixels.max(axis=2) == 0).any(), "seam at scale {0}".format(scale))
+
+    def test_world_file_matches_the_preview_resolution(self):
+        from raster_backend import world_file
+        out_image = self.preview(4)
+        with open(world_file(out_image)) as f:
+            a, d, b, e, c, f_ = [float(v) for v in f.read().split()]
+        self.assertEqual((a, e), (4.0, -4.0))
+        self.assertEqual((c, f_), (2.0, GRID * TILE_SIZE - 2.0))
+
+    def test_masked_area_is_textured(self):
+        with Image.open(self.preview(2)) as preview:
+            centre = preview.convert("RGB").getpixel((64, 80))  # Inside the fully masked tile22
+        with Image.open(path.join(self.tiles, "tile22.jpg")) as source:
+            self.assertNotEqual(centre, source.convert("RGB").getpixel((0, 0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+# Headless checks of the throughput monitor and cooperative cancellation
+#   python -m unittest discover -s Scripts/tests
+
+import json
+import sys
+import unittest
+from os import path, listdir
+from shutil import rmtree
+from tempfile import mkdtemp
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from run_monitor import ThroughputMonitor, CancelToken, CancelledError, clean_intermediates, CANCEL_FILE  # noqa: E402
+
+
+class ThroughputMonitorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.folder)
+
+    def test_snapshot_counts_tiles_bytes_and_categories(self):
+        monitor = ThroughputMonitor(4)
+        monitor.tile_done(0, {"category": "full", "bytes": 1024 * 1024})
+        monitor.tile_done(1, {"category": "partial", "bytes": 1024 * 1024})
+        monitor.tile_done(2, None)
+        s = monitor.snapshot()
+        self.assertEqual((s["tiles_done"], s["tiles_total"], s["bytes_written"]), (3, 4, 2 * 1024 * 1024))
+        self.assertEqual(s["tiles"], {"full": 1, "partial": 1})
+        self.assertGreater(s["tiles_per_second"], 0)
+        self.assertAlmostEqual(s["eta_seconds"], 1 / s["tiles_per_second"])
+        self.assertIn("3/4 tiles", monitor.label())
+
+    def test_old_tiles_leave_the_rolling_window(self):
+        monitor = ThroughputMonitor(2, window=60)
+        monitor.tile_done(0, {"bytes": 10})
+        monitor.recent[0] = (monitor.recent[0][0] - 120, 10)
+        s = monitor.snapshot()
+        self.assertEqual((s["tiles_done"], s["tiles_per_second"], s["eta_seconds"]), (1, 0, None))
+
+    def test_prometheus_text(self):
+        monitor = ThroughputMonitor(2)
+        monitor.tile_done(0, {"category": "full", "bytes": 5})
+        text = monitor.prometheus(monitor.snapshot())
+        self.assertIn("# TYPE texture_masking_tiles_done counter\ntexture_masking_tiles_done 1\n", text)
+        self.assertIn('texture_masking_category_tiles{category="full"} 1\n', text)
+        self.assertIn("texture_masking_running 1\n", text)
+        self.assertNotIn("eta_seconds None", text)
+
+    def test_metrics_file_records_the_final_status(self):
+        metrics_file = path.join(self.folder, "metrics.json")
+        with ThroughputMonitor(1, metrics_file) as monitor:
+            monitor.tile_done(0, {"bytes": 1})
+        with open(metrics_file) as f:
+            self.assertEqual(json.load(f)["status"], "finished")
+        prom_file = path.join(self.folder, "metrics.prom")
+        with self.assertRaises(CancelledError):
+            with ThroughputMonitor(1, prom_file):
+                raise CancelledError()
+        with open(prom_file) as f:
+            self.assertIn("texture_masking_running 0\n", f.read())
+        self.assertEqual(sorted(listdir(self.folder)), ["metrics.json", "metrics.prom"])
+
+
+class CancelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.cancel_file = path.join(self.folder, CANCEL_FILE)
+
+    def tearDown(self):
+        rmtree(self.folder)
+
+    def test_cancel_file_sets_the_token(self):
+        open(self.cancel_file, "w").close()
+        token = CancelToken(self.cancel_file)  # Left over from an earlier run
+        self.assertFalse(path.exists(self.cancel_file))
+        self.assertFalse(token.is_set())
+        open(self.cancel_file, "w").close()
+        self.assertTrue(token.is_set())
+
+    def test_cancel(self):
+        token = CancelToken()
+        self.assertFalse(token.is_set())
+        token.cancel()
+        self.assertTrue(token.is_set())
+
+    def test_intermediates_are_removed(self):
+        names = ["tile_design.jpg", "tile_mask.jpg", "tile_maskTemp.tif", "tile_design.jpg.1234.tmp"]
+        for name in names:
+            open(path.join(self.folder, name), "w").close()
+        self.assertEqual(clean_intermediates(self.folder), 3)
+        self.assertEqual(listdir(self.folder), ["tile_design.jpg"])
+
+
+if __name__ == "__main__":
+    unittest.main()
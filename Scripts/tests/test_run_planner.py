@@ -0,0 +1,114 @@
+# Headless checks of the dry-run planner and its calibration
+#   python -m unittest discover -s Scripts/tests
+
+import json
+import sys
+import tempfile
+import unittest
+from os import path, makedirs
+from shutil import rmtree
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from run_planner import (polygon_area, tile_category, concurrency, load_calibration, record_calibration,  # noqa: E402
+                         format_plan, UNTOUCHED, PARTIAL, FULL, CATEGORIES, DEFAULT_CALIBRATION)
+
+try:
+    import numpy  # noqa: F401
+    from PIL import Image
+except ImportError:
+    Image = None
+
+if Image is not None:
+    from test_pillow_pipeline import make_mosaic
+
+SQUARE = [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]
+HOLE = [[2, 2], [2, 4], [4, 4], [4, 2], [2, 2]]
+
+
+class PolygonAreaTest(unittest.TestCase):
+
+    def test_geojson_and_esri_json_rings(self):
+        self.assertEqual(polygon_area([SQUARE, HOLE]), 96.0)
+        esri = json.dumps({"rings": [[[x, y] for x, y in reversed(SQUARE)], [[x, y] for x, y in reversed(HOLE)]]})
+        self.assertEqual(polygon_area(esri), 96.0)
+
+    def test_tile_category(self):
+        tile = ["a", 0, 10, 0, 10, 10, 10]
+        self.assertEqual(tile_category(tile, []), UNTOUCHED)
+        self.assertEqual(tile_category(tile, [[SQUARE, HOLE]]), PARTIAL)
+        self.assertEqual(tile_category(tile, [[SQUARE]]), FULL)
+
+    def test_concurrency_follows_the_run_mode(self):
+        i_list = [["a", 0, 10, 0, 10, 1000, 1000]]
+        self.assertEqual(concurrency(i_list, 2, None, 8, "queue"), 8)
+        self.assertEqual(concurrency(i_list, 2, None, 0, "queue"), 1)
+        self.assertEqual(concurrency(i_list, 2, None, 8, None), 1)
+        self.assertEqual(concurrency(i_list, 2, 100000, 4, None), 4)
+
+
+class CalibrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.tempdir, tempfile.tempdir = tempfile.tempdir, self.root
+
+    def tearDown(self):
+        tempfile.tempdir = self.tempdir
+        rmtree(self.root)
+
+    def test_first_run_replaces_the_defaults_then_smooths(self):
+        calibration, calibrated = load_calibration()
+        self.assertFalse(calibrated)
+        self.assertEqual(calibration, DEFAULT_CALIBRATION)
+        record_calibration([{"category": FULL, "pixels": 1e6, "bytes": 2e5, "mask": 2.0, "blend": 4.0}])
+        calibration, calibrated = load_calibration()
+        self.assertTrue(calibrated)
+        self.assertEqual((calibration[FULL]["mask"], calibration[FULL]["blend"]), (2.0, 4.0))
+        self.assertEqual(calibration[FULL]["bytes_per_pixel"], 0.2)
+        self.assertEqual(calibration[PARTIAL], DEFAULT_CALIBRATION[PARTIAL])
+        record_calibration([{"category": FULL, "pixels": 1e6, "bytes": 2e5, "mask": 12.0}])
+        self.assertAlmostEqual(load_calibration()[0][FULL]["mask"], 5.0)
+
+    def test_plan_is_formatted(self):
+        plan = {"mosaic": "m", "calibrated": False, "intersections": 3, "bytes": 1024 * 1024, "cpu_seconds": 10,
+                "tiles": {category: 1 for category in CATEGORIES}, "cache_hits": 0, "workers": 2,
+                "wall_seconds": 5}
+        lines = format_plan(plan)
+        self.assertIn("3 tiles (1 untouched, 1 partial, 1 fully masked)", lines[0])
+        self.assertIn("0:00:05 on 2 workers (uncalibrated", lines[2])
+
+
+@unittest.skipIf(Image is None, "Pillow and numpy are required")
+class PlanMosaicTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.tempdir, tempfile.tempdir = tempfile.tempdir, self.root
+        self.tiles, self.texture, self.polygon = make_mosaic(self.root)
+
+    def tearDown(self):
+        tempfile.tempdir = self.tempdir
+        rmtree(self.root)
+
+    def test_plan_matches_the_run(self):
+        from run_planner import plan_mosaic
+        from Mosaic_Texture_Masking import get_images_and_stats, prepare_texture_jobs, run_texture_jobs
+        plan = plan_mosaic(self.tiles, self.polygon, 2, backend="pillow")
+        out_folder = path.join(self.root, "out")
+        makedirs(out_folder)
+        i_list, extent = get_images_and_stats(self.tiles, "pillow")
+        jobs, estimates, work_dir = prepare_texture_jobs(i_list, self.texture, self.polygon, out_folder,
+                                                         "GaussianBlur", 2, "pillow")
+        try:
+            results = run_texture_jobs(jobs, estimates, None, None, None, False, backend="pillow")
+        finally:
+            rmtree(work_dir)
+        categories = [r["category"] for r in results]
+        self.assertEqual(plan["tiles"], {category: categories.count(category) for category in CATEGORIES})
+        self.assertEqual(plan["cache_hits"], len([r for r in results if "cache_hit" in r]))
+        self.assertTrue(load_calibration()[1])  # The run was recorded
+
+
+if __name__ == "__main__":
+    unittest.main()
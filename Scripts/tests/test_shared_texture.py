@@ -0,0 +1,65 @@
+# Headless checks of the memory mapped texture shared by tile workers
+#   python -m unittest discover -s Scripts/tests
+
+import sys
+import unittest
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+try:
+    import numpy
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+@unittest.skipIf(Image is None, "Pillow and numpy are required")
+class SharedTextureTest(unittest.TestCase):
+
+    def setUp(self):
+        from shared_texture import create_shared_texture
+        self.folder = mkdtemp()
+        self.in_texture = path.join(self.folder, "texture.png")
+        texture = Image.new("RGB", (30, 20))
+        texture.putdata([(x * 8, y * 12, (x * y) % 256) for y in range(20) for x in range(30)])
+        texture.save(self.in_texture)
+        self.expected = Image.open(self.in_texture).convert("RGB").resize((50, 40), Image.LANCZOS)
+        self.descriptor = create_shared_texture(self.in_texture, 50, 40, self.folder)
+
+    def tearDown(self):
+        from shared_texture import detach
+        detach()
+        rmtree(self.folder)
+
+    def test_in_bounds_crop_is_a_view_matching_pil(self):
+        from shared_texture import crop
+        box = (7, 5, 31, 22)
+        view = crop(self.descriptor, box)
+        self.assertIsInstance(view, numpy.memmap)
+        self.assertFalse(view.flags["C_CONTIGUOUS"])
+        # Non-contiguous views go through Image.fromarray in mask_image
+        self.assertEqual(Image.fromarray(view).tobytes(), self.expected.crop(box).tobytes())
+
+    def test_out_of_bounds_crop_matches_pil(self):
+        from shared_texture import crop
+        box = (40, -5, 60, 15)
+        cropped = crop(self.descriptor, box)
+        self.assertEqual(cropped.shape, (20, 20, 3))
+        self.assertEqual(Image.fromarray(cropped).tobytes(), self.expected.crop(box).tobytes())
+
+    def test_texture_is_mapped_once_and_released(self):
+        import shared_texture
+        first = shared_texture.attach(self.descriptor)
+        self.assertIs(shared_texture.attach(self.descriptor), first)
+        other = shared_texture.create_shared_texture(self.in_texture, 10, 10, self.folder)
+        shared_texture.attach(other)
+        self.assertEqual(list(shared_texture._attached), [other[0]])  # Earlier texture is unmapped
+        shared_texture.detach()
+        self.assertEqual(shared_texture._attached, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
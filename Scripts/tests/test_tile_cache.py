@@ -0,0 +1,95 @@
+# Headless checks of the content-addressed cache of fully masked tiles
+#   python -m unittest discover -s Scripts/tests
+
+import sys
+import tempfile
+import unittest
+from os import path, makedirs
+from shutil import rmtree
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+try:
+    import numpy  # noqa: F401
+    from PIL import Image
+except ImportError:
+    Image = None
+
+if Image is not None:
+    from test_pillow_pipeline import make_mosaic, tile_digests
+
+
+@unittest.skipIf(Image is None, "Pillow and numpy are required")
+class TileCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.root)
+
+    def test_only_fully_masked_tiles_get_a_key(self):
+        from tile_cache import fully_masked_key
+        texture, full, partial = [path.join(self.root, name + ".png") for name in ["texture", "full", "partial"]]
+        Image.new("RGB", (8, 8), (9, 9, 9)).save(texture)
+        Image.new("L", (8, 8), 0).save(full)
+        mask = Image.new("L", (8, 8), 0)
+        mask.putpixel((3, 3), 255)
+        mask.save(partial)
+        key = fully_masked_key(full, texture, (8, 8), (0, 0, 8, 8), (8, 8), "None", 0)
+        self.assertEqual(key, fully_masked_key(full, texture, (8, 8), (0, 0, 8, 8), (8, 8), "None", 0))
+        self.assertNotEqual(key, fully_masked_key(full, texture, (8, 8), (8, 0, 16, 8), (8, 8), "None", 0))
+        self.assertIsNone(fully_masked_key(partial, texture, (8, 8), (0, 0, 8, 8), (8, 8), "None", 0))
+
+    def test_stored_tile_is_fetched_with_the_tiles_own_world_file(self):
+        from tile_cache import TileCache
+        cache = TileCache(path.join(self.root, "cache"))
+        first, second = path.join(self.root, "a_design.jpg"), path.join(self.root, "b_design.jpg")
+        Image.new("RGB", (8, 8), (1, 2, 3)).save(first)
+        with open(path.join(self.root, "b.jgw"), "w") as f:
+            f.write("1.0\n0\n0\n-1.0\n8.5\n7.5\n")
+        self.assertFalse(cache.fetch("key", path.join(self.root, "b.jpg"), second))
+        cache.store("key", first)
+        self.assertTrue(cache.fetch("key", path.join(self.root, "b.jpg"), second))
+        with open(first, "rb") as a, open(second, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+        self.assertTrue(path.exists(path.join(self.root, "b_design.jgw")))
+        self.assertFalse(cache.fetch("other", path.join(self.root, "b.jpg"), second))
+
+
+@unittest.skipIf(Image is None, "Pillow and numpy are required")
+class DedupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        # Calibration and generalized polygon caches go to the temp folder, keep them out of the user's
+        self.tempdir, tempfile.tempdir = tempfile.tempdir, self.root
+        self.tiles, self.texture, self.polygon = make_mosaic(self.root)
+
+    def tearDown(self):
+        tempfile.tempdir = self.tempdir
+        rmtree(self.root)
+
+    def test_dedup_matches_full_blends(self):
+        from Mosaic_Texture_Masking import get_images_and_stats, prepare_texture_jobs, run_texture_jobs
+        i_list, extent = get_images_and_stats(self.tiles, "pillow")
+        digests = []
+        cache_hits = []
+        for dedup in [True, False]:
+            out_folder = path.join(self.root, "dedup" if dedup else "no_dedup")
+            makedirs(out_folder)
+            jobs, estimates, work_dir = prepare_texture_jobs(i_list, self.texture, self.polygon, out_folder,
+                                                             "GaussianBlur", 2, "pillow", dedup)
+            try:
+                results = run_texture_jobs(jobs, estimates, None, None, None, False, backend="pillow")
+            finally:
+                rmtree(work_dir)
+            digests.append(tile_digests(out_folder))
+            cache_hits.append(len([r for r in results if "cache_hit" in r]))
+        # The four fully masked tiles share a crop, all but the first come from the tile cache
+        self.assertEqual(cache_hits, [3, 0])
+        self.assertEqual(digests[0], digests[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+# Headless checks of the shared folder work queue, including the claim / reaper race
+#   python -m unittest discover -s Scripts/tests
+
+import sys
+import unittest
+from os import path, listdir, utime
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import work_queue  # noqa: E402
+from work_queue import (queue_folders, publish_jobs, claim_job, requeue_expired, finish_job, withdraw_jobs,  # noqa: E402
+                        iter_finished, run_worker, PENDING, CLAIMED, DONE, FAILED, LEASE, MAX_ATTEMPTS)
+from raster_backend import BACKENDS, PillowBackend  # noqa: E402
+
+calls = []
+
+
+class RecordingBackend(PillowBackend):
+    name = "recording_queue"
+
+    def init_worker(self):
+        calls.append("init")
+
+    def release_worker(self):
+        calls.append("release")
+
+
+BACKENDS[RecordingBackend.name] = RecordingBackend
+
+
+def age(file_name, seconds):
+    then = time() - seconds
+    utime(file_name, (then, then))
+
+
+class WorkQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queue_dir = mkdtemp()
+        self.folders = queue_folders(self.queue_dir)
+
+    def tearDown(self):
+        rmtree(self.queue_dir)
+
+    def test_claim_and_finish(self):
+        job_ids = publish_jobs(self.queue_dir, "texture_image", [["a"], ["b"]], "batch")
+        job, claimed = claim_job(self.folders)
+        self.assertEqual(job["id"], job_ids[0])
+        self.assertTrue(path.exists(claimed + LEASE))
+        finish_job(self.folders, claimed, job, result={"pixels": 1})
+        self.assertEqual(listdir(self.folders[CLAIMED]), [])
+        self.assertEqual(list(iter_finished(self.queue_dir, job_ids[:1], poll=0)),
+                         [(job_ids[0], dict(job, result={"pixels": 1}))])
+
+    def test_fresh_claim_of_an_old_job_is_not_requeued(self):
+        # rename keeps the publish time, a reaper must not take the job before its first heartbeat
+        job_ids = publish_jobs(self.queue_dir, "texture_image", [["a"]])
+        age(path.join(self.folders[PENDING], job_ids[0] + ".json"), 300)
+        job, claimed = claim_job(self.folders)
+        requeue_expired(self.folders, lease_timeout=60)
+        self.assertTrue(path.exists(claimed))
+        self.assertEqual(listdir(self.folders[PENDING]), [])
+
+    def test_job_lost_to_a_reaper_during_the_claim_is_skipped(self):
+        job_ids = publish_jobs(self.queue_dir, "texture_image", [["a"], ["b"]])
+
+        def reaped(target, times):
+            # A reaper renames the job away between the claim's rename and its lease
+            work_queue.utime = utime
+            work_queue.rename(target, path.join(self.folders[PENDING], path.basename(target)))
+
+        work_queue.utime = reaped
+        try:
+            job, claimed = claim_job(self.folders)
+        finally:
+            work_queue.utime = utime
+        self.assertEqual(job["id"], job_ids[1])
+        self.assertEqual(sorted(listdir(self.folders[CLAIMED])), [job_ids[1] + ".json", job_ids[1] + ".json" + LEASE])
+        self.assertEqual(listdir(self.folders[PENDING]), [job_ids[0] + ".json"])
+
+    def test_expired_lease_is_requeued_then_failed(self):
+        publish_jobs(self.queue_dir, "texture_image", [["a"]])
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            job, claimed = claim_job(self.folders)
+            age(claimed + LEASE, 300)
+            requeue_expired(self.folders, lease_timeout=60)
+            self.assertEqual(listdir(self.folders[CLAIMED]), [])
+        self.assertEqual(listdir(self.folders[PENDING]), [])
+        self.assertEqual(len(listdir(self.folders[FAILED])), 1)
+
+    def test_orphan_lease_is_removed(self):
+        open(path.join(self.folders[CLAIMED], "gone.json" + LEASE), "w").close()
+        requeue_expired(self.folders)
+        self.assertEqual(listdir(self.folders[CLAIMED]), [])
+
+    def test_late_finish_after_requeue_is_dropped(self):
+        publish_jobs(self.queue_dir, "texture_image", [["a"]])
+        job, claimed = claim_job(self.folders)
+        age(claimed + LEASE, 300)
+        requeue_expired(self.folders, lease_timeout=60)
+        finish_job(self.folders, claimed, job, result={})
+        self.assertEqual(listdir(self.folders[DONE]), [])
+        self.assertEqual(len(listdir(self.folders[PENDING])), 1)
+
+    def test_worker_sets_up_and_releases_its_backend(self):
+        publish_jobs(self.queue_dir, "unknown", [[]])
+        del calls[:]
+        self.assertEqual(run_worker(self.queue_dir, poll=0, backend=RecordingBackend.name), 1)
+        self.assertEqual(calls, ["init", "release"])
+        self.assertEqual(len(listdir(self.folders[FAILED])), 1)  # KeyError of the unknown job is reported
+
+    def test_withdraw_and_no_worker_left(self):
+        job_ids = publish_jobs(self.queue_dir, "texture_image", [["a"], ["b"]])
+        claim_job(self.folders)
+        self.assertEqual(withdraw_jobs(self.folders, job_ids), [job_ids[1]])
+        publish_jobs(self.queue_dir, "texture_image", [["c"]], "late")
+        with self.assertRaises(RuntimeError):
+            list(iter_finished(self.queue_dir, ["late_000000"], poll=0.01, lease_timeout=0.05,
+                               workers_alive=lambda: False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# ----------------------------------------------------------------------------------------------------
+# Name:        tile_cache.py
+# Purpose:     Content addressed cache of fully masked texture tiles
+#              - Tiles fully covered by the mask come out as the texture crop alone, so tiles sharing
+#                (texture, crop window, tile size, blur settings, mask) are byte identical
+#              - The first result is stored once, later identical tiles are hardlinked (or copied) from it and
+#                only receive their own world file / auxiliary files
+# Authors:     Geoff Taylor | Solution Engineer | Imagery & Remote Sensing
+# Created:     10/19/2026
+# Copyright:   (c) Esri 2026
+# Licence:     Apache Version 2.0
+# -----------------------------------------------------------------------------------------------------
+
+from hashlib import sha1
+from os import path, makedirs, remove, replace, getpid
+
+PYRAMID_EXTENSIONS = [".ovr"]
+_file_digests = {}
+
+
+def file_digest(in_file):
+    # Memoized per process on (path, size, mtime), textures are hashed once per worker
+    stat_key = (in_file, path.getsize(in_file), path.getmtime(in_file))
+    if stat_key not in _file_digests:
+        digest = sha1()
+        with open(in_file, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        _file_digests[stat_key] = digest.hexdigest()
+    return _file_digests[stat_key]
+
+
+def fully_masked_key(in_mask, in_texture, texture_size, crop, tile_size, method, blur_distance):
+    # Cache key for a tile whose mask is entirely 0 (all texture), None when the tile shows source pixels
+    from PIL import Image
+    mask = Image.open(in_mask).convert('L')
+    if mask.getextrema()[1] != 0:
+        return None
+    key = sha1()
+    for part in [file_digest(in_texture), texture_size, crop, tile_size, method, blur_distance,
+                 sha1(mask.tobytes()).hexdigest()]:
+        key.update(repr(part).encode("utf-8"))
+    return key.hexdigest()
+
+
+def link_or_copy(source, target):
+    from os import link
+    from shutil import copyfile
+    temp = "{0}.{1}.tmp".format(target, getpid())
+    try:
+        link(source, temp)
+    except OSError:
+        copyfile(source, temp)
+    replace(temp, target)
+
+
+class TileCache:
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        if not path.exists(cache_dir):
+            makedirs(cache_dir, exist_ok=True)
+
+    def entry(self, key, out_raster):
+        return path.join(self.cache_dir, key + path.splitext(out_raster)[1].lower())
+
+    def fetch(self, key, in_image, out_raster):
+        from fill_masked_image import copy_auxillary_files
+        cached = self.entry(key, out_raster)
+        if not path.exists(cached):
+            return False
+        if path.exists(out_raster):
+            remove(out_raster)
+        link_or_copy(cached, out_raster)
+        for ext in PYRAMID_EXTENSIONS:
+            if path.exists(cached + ext):
+                link_or_copy(cached + ext, out_raster + ext)
+        copy_auxillary_files(in_image, out_raster)  # The tile's own world file
+        return True
+
+    def store(self, key, out_raster):
+        cached = self.entry(key, out_raster)
+        if path.exists(cached):
+            return
+        # Pyramids first, the image itself marks the entry as complete
+        for ext in PYRAMID_EXTENSIONS:
+            if path.exists(out_raster + ext):
+                link_or_copy(out_raster + ext, cached + ext)
+        link_or_copy(out_raster, cached)
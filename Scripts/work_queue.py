@@ -0,0 +1,270 @@
+# ----------------------------------------------------------------------------------------------------
+# Name:        work_queue.py
+# Purpose:     Shared filesystem work queue for distributing tile jobs across processes and hosts
+#              - Jobs are JSON files published to <queue>/pending
+#              - Workers claim a job by atomically renaming it into <queue>/claimed and keep a lease file
+#                heartbeat alive while working; jobs with expired leases are returned to pending
+#              - Any number of worker processes, on any host that can see the queue folder, drain the queue
+# Authors:     Geoff Taylor | Solution Engineer | Imagery & Remote Sensing
+# Created:     10/19/2026
+# Copyright:   (c) Esri 2026
+# Licence:     Apache Version 2.0
+# -----------------------------------------------------------------------------------------------------
+
+import json
+from os import path, makedirs, listdir, rename, replace, remove, utime, getpid
+from time import time, sleep
+
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+TEMP = "tmp"
+LEASE = ".lease"
+HEARTBEAT = 10  # Seconds between lease refreshes
+LEASE_TIMEOUT = 60  # Seconds without heartbeat before a claimed job is given to another worker
+MAX_ATTEMPTS = 3
+
+
+def queue_folders(queue_dir):
+    folders = {}
+    for name in [PENDING, CLAIMED, DONE, FAILED, TEMP]:
+        folders[name] = path.join(queue_dir, name)
+        if not path.exists(folders[name]):
+            makedirs(folders[name], exist_ok=True)
+    return folders
+
+
+def worker_name():
+    from socket import gethostname
+    return "{0}_{1}".format(gethostname(), getpid())
+
+
+def write_json(folders, folder, job_id, job):
+    # Write to tmp then rename so readers never see a partial file
+    temp = path.join(folders[TEMP], "{0}_{1}.json".format(job_id, worker_name()))
+    with open(temp, "w") as f:
+        json.dump(job, f)
+    replace(temp, path.join(folders[folder], job_id + ".json"))
+
+
+def publish_jobs(queue_dir, func, jobs, batch_id=None):
+    # func is a key of job_handlers(), jobs is a list of argument lists. Returns the published job ids.
+    from uuid import uuid4
+    folders = queue_folders(queue_dir)
+    batch_id = batch_id or uuid4().hex[:12]
+    job_ids = []
+    for n, args in enumerate(jobs):
+        job_id = "{0}_{1:06d}".format(batch_id, n)
+        write_json(folders, PENDING, job_id, {"id": job_id, "func": func, "args": list(args), "attempts": 0})
+        job_ids.append(job_id)
+    return job_ids
+
+
+def claim_job(folders):
+    for name in sorted(listdir(folders[PENDING])):
+        source = path.join(folders[PENDING], name)
+        target = path.join(folders[CLAIMED], name)
+        try:
+            rename(source, target)  # Atomic: exactly one worker wins the claim
+            # rename keeps the publish time, refresh it so a reaper does not see an expired claim before
+            # the lease exists
+            utime(target, None)
+            with open(target + LEASE, "w") as f:
+                f.write(worker_name())
+            with open(target) as f:
+                return json.load(f), target
+        except (OSError, ValueError):
+            # Lost the job to a reaper between the rename and the lease
+            try:
+                remove(target + LEASE)
+            except OSError:
+                pass
+            continue
+    return None, None
+
+
+def claimed_jobs(folders):
+    return [name for name in listdir(folders[CLAIMED]) if not name.endswith(LEASE)]
+
+
+def requeue_expired(folders, lease_timeout=LEASE_TIMEOUT, max_attempts=MAX_ATTEMPTS):
+    # Return jobs whose worker stopped heartbeating to pending (or failed after max_attempts)
+    now = time()
+    for name in listdir(folders[CLAIMED]):
+        if name.endswith(LEASE):
+            if not path.exists(path.join(folders[CLAIMED], name[:-len(LEASE)])):
+                try:
+                    remove(path.join(folders[CLAIMED], name))  # Orphaned, its job was finished or requeued
+                except OSError:
+                    pass
+            continue
+        claimed = path.join(folders[CLAIMED], name)
+        lease = claimed + LEASE
+        try:
+            last_beat = path.getmtime(lease) if path.exists(lease) else path.getmtime(claimed)
+            if now - last_beat < lease_timeout:
+                continue
+            with open(claimed) as f:
+                job = json.load(f)
+            stale = path.join(folders[TEMP], name + ".stale_" + worker_name())
+            rename(claimed, stale)  # Only one reaper wins
+        except (OSError, ValueError):
+            continue
+        job["attempts"] = job.get("attempts", 0) + 1
+        if job["attempts"] >= max_attempts:
+            job["error"] = "Lease expired {0} times".format(job["attempts"])
+            write_json(folders, FAILED, job["id"], job)
+        else:
+            write_json(folders, PENDING, job["id"], job)
+        remove(stale)
+        try:
+            remove(lease)
+        except OSError:
+            pass
+
+
+class Heartbeat:
+
+    def __init__(self, lease, interval=HEARTBEAT):
+        from threading import Thread, Event
+        self.lease = lease
+        self.interval = interval
+        self.stopped = Event()
+        self.thread = Thread(target=self.beat, daemon=True)
+
+    def beat(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                utime(self.lease, None)
+            except OSError:
+                return  # Lease was taken away from this worker
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+def finish_job(folders, claimed, job, error=None, result=None):
+    if error:
+        job["error"] = error
+    job["result"] = result
+    job["worker"] = worker_name()
+    try:
+        remove(claimed)
+    except OSError:
+        return  # Lease expired and the job was handed to another worker, let that one report
+    try:
+        remove(claimed + LEASE)
+    except OSError:
+        pass
+    write_json(folders, FAILED if error else DONE, job["id"], job)
+
+
+def job_handlers():
+    from Mosaic_Texture_Masking import texture_image
+    return {"texture_image": texture_image}
+
+
+def run_worker(queue_dir, stop_when_empty=True, poll=5, lease_timeout=LEASE_TIMEOUT, backend=None):
+    # backend (name, arcpy by default) is set up once for the worker's life, e.g. Image Analyst is checked out
+    from traceback import format_exc
+    from raster_backend import get_backend
+    from shared_texture import detach
+    folders = queue_folders(queue_dir)
+    handlers = job_handlers()
+    backend = get_backend(backend)
+    backend.init_worker()
+    processed = 0
+    try:
+        while True:
+            requeue_expired(folders, lease_timeout)
+            job, claimed = claim_job(folders)
+            if job is None:
+                if stop_when_empty and not claimed_jobs(folders):
+                    return processed
+                sleep(poll)
+                continue
+            print("{0} processing {1}".format(worker_name(), job["id"]))
+            with Heartbeat(claimed + LEASE, min(HEARTBEAT, lease_timeout / 3.0)):
+                result = None
+                try:
+                    result = handlers[job["func"]](*job["args"])
+                    error = None
+                except Exception:
+                    error = format_exc()
+                finally:
+                    detach()  # Workers on other hosts outlive the run, release its shared texture
+            finish_job(folders, claimed, job, error, result)
+            processed += 1
+    finally:
+        backend.release_worker()
+
+
+def run_local_workers(queue_dir, worker_count, stop_when_empty=True, backend=None):
+    from multiprocessing import Process
+    from memory_scheduler import set_worker_executable
+    set_worker_executable()
+    workers = [Process(target=run_worker, args=(queue_dir, stop_when_empty), kwargs={"backend": backend})
+               for _ in range(worker_count)]
+    for w in workers:
+        w.start()
+    return workers
+
+
+def withdraw_jobs(folders, job_ids):
+    # Removes jobs no worker has claimed yet. Returns their ids.
+    withdrawn = []
+    for job_id in job_ids:
+        try:
+            remove(path.join(folders[PENDING], job_id + ".json"))
+            withdrawn.append(job_id)
+        except OSError:
+            pass  # Claimed (or already finished)
+    return withdrawn
+
+
+def iter_finished(queue_dir, job_ids, poll=5, lease_timeout=LEASE_TIMEOUT, cancelled=None, workers_alive=None):
+    # Yields (job_id, job) as each job is done or failed (failed jobs carry an "error").
+    # Once cancelled() is true, jobs still pending are withdrawn and only claimed jobs are waited for.
+    # Once workers_alive() is false (the local workers exited), RuntimeError is raised when no pending job has
+    # been claimed for lease_timeout seconds, i.e. no other host is draining the queue either.
+    folders = queue_folders(queue_dir)
+    remaining = set(job_ids)
+    stalled = (None, time())  # (pending job count, since)
+    while remaining:
+        if workers_alive is not None and not workers_alive():
+            pending = len([job_id for job_id in remaining
+                           if path.exists(path.join(folders[PENDING], job_id + ".json"))])
+            if pending != stalled[0]:
+                stalled = (pending, time())
+            elif pending and time() - stalled[1] > lease_timeout:
+                raise RuntimeError("No worker left, {0} jobs still pending in {1}".format(pending, queue_dir))
+        requeue_expired(folders, lease_timeout)
+        if cancelled and cancelled():
+            remaining.difference_update(withdraw_jobs(folders, remaining))
+        for folder in [DONE, FAILED]:
+            for f in listdir(folders[folder]):
+                job_id = path.splitext(f)[0]
+                if job_id not in remaining:
+                    continue
+                remaining.discard(job_id)
+                with open(path.join(folders[folder], f)) as job_file:
+                    yield job_id, json.load(job_file)
+        if remaining:
+            sleep(poll)
+
+
+if __name__ == "__main__":
+    # Worker entry point, run on any host that can see the queue folder:
+    #   python work_queue.py <queue_dir> [worker_count] [backend]
+    import sys
+    in_queue_dir = sys.argv[1]
+    in_worker_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    in_backend = sys.argv[3] if len(sys.argv) > 3 else "arcpy"
+    for p in run_local_workers(in_queue_dir, in_worker_count, stop_when_empty=False, backend=in_backend):
+        p.join()
@@ -0,0 +1,147 @@
+# ----------------------------------------------------------------------------------------------------
+# Name:        worker_daemon.py
+# Purpose:     Long lived local worker that keeps arcpy imported and the Image Analyst extension checked out
+#              - Accepts create_mask / mask_image / texture_image jobs over a local socket
+#              - Short interactive and scripted runs submit jobs instead of paying the startup tax each time
+# Authors:     Geoff Taylor | Solution Engineer | Imagery & Remote Sensing
+# Created:     10/19/2026
+# Copyright:   (c) Esri 2026
+# Licence:     Apache Version 2.0
+# -----------------------------------------------------------------------------------------------------
+
+from os import path
+
+ADDRESS = ("localhost", 6789)
+# A random key is written here by each serve(), readable by the current user only; clients read it to connect
+AUTHKEY_FILE = path.join(path.expanduser("~"), ".ArcGIS_Image_Designer", "worker_daemon.key")
+
+
+def create_authkey(key_file=AUTHKEY_FILE):
+    from os import makedirs, urandom, open as os_open, fdopen, chmod, remove, O_WRONLY, O_CREAT, O_EXCL
+    authkey = urandom(32)
+    makedirs(path.dirname(key_file), mode=0o700, exist_ok=True)
+    if path.exists(key_file):
+        remove(key_file)
+    # O_EXCL with mode 0600: the key is never readable by other users, not even briefly
+    with fdopen(os_open(key_file, O_WRONLY | O_CREAT | O_EXCL, 0o600), "wb") as f:
+        f.write(authkey)
+    chmod(key_file, 0o600)
+    return authkey
+
+
+def read_authkey(key_file=AUTHKEY_FILE):
+    # None when no daemon has been started by this user
+    try:
+        with open(key_file, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def job_handlers(backend):
+    from functools import partial
+    from fill_masked_image import mask_image
+    from Mosaic_Texture_Masking import texture_image
+    from raster_backend import get_backend
+    backend = get_backend(backend)
+    return {"create_mask": backend.create_mask, "mask_image": partial(mask_image, backend=backend),
+            "texture_image": texture_image}
+
+
+def serve(address=ADDRESS, authkey=None, backend="arcpy"):
+    # Requests are (func, args) tuples, replies are ("ok", result) or ("error", traceback).
+    # ("shutdown", ()) stops the daemon. Only clients holding the authkey get to send a request.
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Listener
+    from traceback import format_exc
+    from shared_texture import detach
+
+    if backend == "arcpy":
+        from arcpy import CheckExtension, CheckOutExtension
+        if CheckExtension("ImageAnalyst") != "Available":
+            print("Image Analyst license is unavailable")
+            return
+        CheckOutExtension("ImageAnalyst")
+    handlers = job_handlers(backend)
+    authkey = authkey or create_authkey()
+    print("Worker daemon listening on {0}:{1}".format(*address))
+    try:
+        with Listener(address, authkey=authkey) as listener:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, EOFError, OSError):
+                    continue  # Wrong key or a client that went away during the handshake
+                with conn:
+                    try:
+                        func, args = conn.recv()
+                    except (EOFError, OSError):
+                        continue  # daemon_available() probe
+                    if func == "shutdown":
+                        conn.send(("ok", None))
+                        return
+                    try:
+                        reply = ("ok", handlers[func](*args))
+                    except Exception:
+                        reply = ("error", format_exc())
+                    finally:
+                        detach()  # Release the job's shared texture so its work folder can be removed
+                    try:
+                        conn.send(reply)
+                    except OSError:
+                        pass  # Client disconnected while the job ran
+    finally:
+        if backend == "arcpy":
+            from arcpy import CheckInExtension
+            CheckInExtension("ImageAnalyst")
+
+
+def daemon_available(address=ADDRESS, authkey=None):
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Client
+    authkey = authkey or read_authkey()
+    if authkey is None:
+        return False
+    try:
+        with Client(address, authkey=authkey):
+            return True
+    except (OSError, EOFError, AuthenticationError):
+        return False
+
+
+def submit(func, args, address=ADDRESS, authkey=None):
+    from multiprocessing.connection import Client
+    authkey = authkey or read_authkey()
+    if authkey is None:
+        raise RuntimeError("Worker daemon key {0} not found, start the daemon first".format(AUTHKEY_FILE))
+    with Client(address, authkey=authkey) as conn:
+        conn.send((func, list(args)))
+        status, result = conn.recv()
+    if status == "error":
+        raise RuntimeError("Worker daemon job {0} failed:\n{1}".format(func, result))
+    return result
+
+
+def shutdown(address=ADDRESS, authkey=None):
+    return submit("shutdown", (), address, authkey)
+
+
+if __name__ == "__main__":
+    # Start the daemon once from the ArcGIS Pro Python Command Prompt, then submit jobs without importing arcpy:
+    #   python worker_daemon.py serve [backend]
+    #   python worker_daemon.py create_mask <in_raster> <in_polygon> <out_raster>
+    #   python worker_daemon.py mask_image <in_image> <in_mask> <in_texture> <out_image> <method> <blur_distance>
+    #   python worker_daemon.py stop
+    import sys
+    command = sys.argv[1]
+    if command == "serve":
+        serve(backend=sys.argv[2] if len(sys.argv) > 2 else "arcpy")
+    elif command == "stop":
+        shutdown()
+    else:
+        in_args = sys.argv[2:]
+        if command == "mask_image":
+            in_args[5] = float(in_args[5])  # Distance in Pixels
+        result = submit(command, in_args)
+        if result is not None:
+            print(result)